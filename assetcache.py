@@ -0,0 +1,107 @@
+# Runnin' asset cache
+# ----------------------------------------------------
+# Images and sounds are loaded the first time they're used instead of all at once before the window shows
+# anything. preload() decodes files on a background thread while the title screen is up, so by the time a run
+# starts they're usually ready and the first use only has to convert them. Fonts go through textCache, which
+# already opens each font once per size. How long every load took is kept in timings. If a texture atlas was
+# built with atlas.py, images in it come from there and are never decoded at all.
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import os
+import threading
+import time
+
+import pygame
+
+
+class AssetCache:
+    """Converted images keyed by (path, size) and sounds keyed by path, each loaded once"""
+
+    def __init__(self, loadSound=pygame.mixer.Sound):
+        self.images = {}
+        self.sounds = {}
+        self.decoded = {}  # path -> surface or sound the preload thread finished, not handed out yet
+        self.loading = {}  # path -> Event set once the preload thread is done with it
+        self.lock = threading.Lock()
+        self.timings = {}  # file name -> ms spent loading it
+        self.thread = None
+        self.atlas = None
+        self.loadSound = loadSound  # for sounds that aren't given a loader of their own
+
+    def time(self, path, start):
+        name = os.path.basename(path)
+        self.timings[name] = self.timings.get(name, 0) + (time.perf_counter() - start) * 1000
+
+    def decode(self, path, load):
+        """The loaded file at path, from the preload thread if it has it and from load otherwise"""
+        event = self.loading.get(path)
+        if event:
+            event.wait()
+            with self.lock:
+                del self.loading[path]
+                if path in self.decoded:
+                    return self.decoded.pop(path)
+        start = time.perf_counter()
+        loaded = load(path)
+        self.time(path, start)
+        return loaded
+
+    def useAtlas(self, atlas):
+        self.atlas = atlas
+
+    def image(self, path, size=None):
+        key = (path, size)
+        if key not in self.images and self.atlas and size:
+            self.images[key] = self.atlas.get(os.path.basename(path), size)
+        if self.images.get(key) is None:
+            surf = self.decode(path, pygame.image.load)
+            start = time.perf_counter()
+            surf = surf.convert_alpha()  # needs the display, so never on the preload thread
+            if size:
+                surf = pygame.transform.scale(surf, size)
+            self.time(path, start)
+            self.images[key] = surf
+        return self.images[key]
+
+    def sound(self, path, volume=1.0, load=None):
+        """The sound at path, decoded with load the first time, audio.loadSfx trims the silence off the start"""
+        if path not in self.sounds:
+            sound = self.decode(path, load or self.loadSound)
+            sound.set_volume(volume)
+            self.sounds[path] = sound
+        return self.sounds[path]
+
+    def preload(self, images=(), sounds=(), loadSound=None):
+        """Start decoding files on a background thread, the mixer has to be initialised first for sounds.
+        Sounds are decoded with loadSound, which has to be the loader sound() will be given for them."""
+        if self.atlas:
+            images = [path for path in images if not self.atlas.has(os.path.basename(path))]
+        loadSound = loadSound or self.loadSound
+        jobs = [(path, pygame.image.load) for path in images] + [(path, loadSound) for path in sounds]
+        jobs = [(path, load) for path, load in jobs if path not in self.loading]
+        for path, _ in jobs:
+            self.loading[path] = threading.Event()
+
+        def work():
+            for path, load in jobs:
+                start = time.perf_counter()
+                try:
+                    loaded = load(path)
+                except (pygame.error, OSError):
+                    loaded = None  # it'll be loaded again when it's used and fail properly there
+                self.time(path, start)
+                with self.lock:
+                    if loaded is not None:
+                        self.decoded[path] = loaded
+                self.loading[path].set()
+
+        self.thread = threading.Thread(target=work, name="preload", daemon=True)
+        self.thread.start()
+
+    def report(self):
+        return "\n".join(f"{name:<24}{ms:8.2f} ms" for name, ms in sorted(self.timings.items(), key=lambda t: -t[1]))
+
+
+assetCache = AssetCache()
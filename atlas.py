@@ -0,0 +1,144 @@
+# Runnin' texture atlas
+# ----------------------------------------------------
+# The powerup icons and the window icon are big PNGs that get decoded and scaled down every launch. This packs
+# them, already scaled, into one file of raw pixels in the byte order the display uses, so loading them is a
+# single mmap with no decoding, scaling or converting, and every sprite is a subsurface of the same surface.
+#
+#   header   "RNAT", version (u8), index length (u32), little endian
+#   index    JSON: atlas width and height, then each sprite's file, size, place in the atlas and where its
+#            source file was when it was built
+#   pixels   BGRA rows, starting at the next multiple of 4 bytes
+#
+# The atlas is built from assets/ with `python atlas.py`, the game loads the PNGs as usual when there isn't one
+# or when a source file changed after it was built.
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+from simulation import POWERUPKINDS
+
+MAGIC = b"RNAT"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")
+
+ASSET_FOLDER = os.path.join(os.path.dirname(os.path.realpath(__file__)), "assets")
+ATLAS_DIR = os.path.join(ASSET_FOLDER, "atlas.bin")
+
+# (file, size it's drawn at), the sizes have to match what the game asks for
+SPRITES = [(kind.icon, (25, 25)) for kind in POWERUPKINDS if kind.icon] + [("logo.png", (64, 64))]
+ATLAS_WIDTH = 128
+
+
+def sourceStamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build(folder=ASSET_FOLDER, path=ATLAS_DIR, sprites=SPRITES):
+    """Scale every sprite, pack them into rows and write the atlas to path"""
+    images = []
+    for name, size in sprites:
+        surf = pygame.image.load(os.path.join(folder, name))
+        # scale is what the game always used for the icons, the logo shrinks too much for it to look right
+        scale = pygame.transform.smoothscale if name == "logo.png" else pygame.transform.scale
+        images.append((name, scale(surf, size)))
+
+    # shelf packing, tallest first so each row wastes as little as it can
+    images.sort(key=lambda item: -item[1].get_height())
+    index = []
+    x = y = rowHeight = 0
+    for name, surf in images:
+        w, h = surf.get_size()
+        if x + w > ATLAS_WIDTH:
+            x, y, rowHeight = 0, y + rowHeight, 0
+        index.append({"file": name, "size": [w, h], "pos": [x, y],
+                      "source": sourceStamp(os.path.join(folder, name))})
+        x += w
+        rowHeight = max(rowHeight, h)
+    height = y + rowHeight
+
+    sheet = pygame.Surface((ATLAS_WIDTH, height), pygame.SRCALPHA, 32)
+    for (name, surf), entry in zip(images, index):
+        sheet.blit(surf, entry["pos"])
+
+    # written next to it and swapped in, so a game starting meanwhile never maps half an atlas
+    indexBytes = json.dumps({"width": ATLAS_WIDTH, "height": height, "sprites": index}).encode()
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(indexBytes)))
+        f.write(indexBytes)
+        f.write(b"\0" * (-f.tell() % 4))
+        f.write(pygame.image.tobytes(sheet, "BGRA"))
+    os.replace(temp, path)
+    return index
+
+
+class Atlas:
+    """A built atlas mapped into memory, get() hands out its sprites as subsurfaces"""
+
+    def __init__(self, path=ATLAS_DIR):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, indexLength = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} isn't a Runnin' atlas")
+        if version != VERSION:
+            raise ValueError(f"atlas version {version} isn't supported")
+        start = HEADER.size
+        index = json.loads(self.data[start:start + indexLength])
+        start += indexLength
+        start += -start % 4
+
+        size = (index["width"], index["height"])
+        if start + size[0] * size[1] * 4 > len(self.data):
+            raise ValueError(f"{path} is cut short")
+        # BGRA is the same layout convert_alpha() gives on little endian displays, so this surface is blitted
+        # straight from the mapped file
+        self.surf = pygame.image.frombuffer(memoryview(self.data)[start:start + size[0] * size[1] * 4], size, "BGRA")
+        self.sprites = {(entry["file"], tuple(entry["size"])): entry for entry in index["sprites"]}
+
+    def stale(self, folder=ASSET_FOLDER):
+        """Whether any source file changed since the atlas was built"""
+        for (name, _), entry in self.sprites.items():
+            try:
+                if sourceStamp(os.path.join(folder, name)) != entry["source"]:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def has(self, name):
+        return any(file == name for file, _ in self.sprites)
+
+    def get(self, name, size):
+        """The sprite for file name at size, or None if it isn't in the atlas"""
+        entry = self.sprites.get((name, tuple(size)))
+        if entry is None:
+            return None
+        return self.surf.subsurface((*entry["pos"], *entry["size"]))
+
+
+def load(path=ATLAS_DIR):
+    """The atlas at path, or None if there isn't one, it's out of date or it can't be read"""
+    try:
+        atlas = Atlas(path)
+        return None if atlas.stale() else atlas
+    except (OSError, ValueError, struct.error, KeyError, TypeError, pygame.error):
+        return None  # a broken atlas only means the PNGs get loaded
+
+
+# ----------------------------------------------------
+# Command line
+# ----------------------------------------------------
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else ATLAS_DIR
+    index = build(path=path)
+    print(f"packed {len(index)} sprites into {path} ({os.path.getsize(path)} bytes)")
@@ -0,0 +1,122 @@
+# Runnin' audio
+# ----------------------------------------------------
+# Sound effects are decoded to PCM once, with the silence the MP3 encoder leaves at the start cut off, and
+# each one plays on a channel of its own that nothing else can take, so a jump always sounds straight away
+# and a new jump cuts off the last one instead of piling up. The mixer is set up with a small buffer before
+# pygame.init() so sounds don't wait behind much already mixed audio. Music streams separately through
+# pygame.mixer.music and doesn't use a channel.
+#
+#   python audio.py --latency     time from the space bar to the jump sound, with SDL's dummy drivers
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import argparse
+import os
+
+import numpy as np
+import pygame
+
+from assetcache import assetCache
+
+FREQUENCY = 44100
+BUFFER = 256  # samples, about 6 ms at 44100 Hz, --audio-buffer 512 if it crackles
+SILENCE = 32  # quieter than this is silence, out of 32767
+
+trimmedMs = {}  # file name -> ms of silence cut off the start
+
+
+def preInit(buffer=BUFFER, frequency=FREQUENCY):
+    """Has to be called before pygame.init(), which would otherwise set the mixer up with its defaults"""
+    pygame.mixer.pre_init(frequency, -16, 2, buffer)
+
+
+def loadSfx(path):
+    """Decode a sound effect and drop the silence before it starts"""
+    sound = pygame.mixer.Sound(path)
+    samples = pygame.sndarray.array(sound)
+    loud = np.abs(samples.reshape(len(samples), -1).astype(np.int32)).max(axis=1) > SILENCE
+    start = int(loud.argmax()) if loud.any() else 0
+    trimmedMs[os.path.basename(path)] = start * 1000 / pygame.mixer.get_init()[0]
+    if start == 0:
+        return sound
+    return pygame.sndarray.make_sound(np.ascontiguousarray(samples[start:]))
+
+
+class Audio:
+    """The sound effects, each on its own reserved channel, and the music"""
+
+    def __init__(self, sfx, assets=assetCache):
+        self.assets = assets
+        self.sfx = {}  # name -> (path, volume, channel)
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), len(sfx)))
+        pygame.mixer.set_reserved(len(sfx))  # Sound.play() won't pick these
+        for i, (name, (path, volume)) in enumerate(sfx.items()):
+            self.sfx[name] = (path, volume, pygame.mixer.Channel(i))
+
+    def play(self, name):
+        path, volume, channel = self.sfx[name]
+        channel.play(self.assets.sound(path, volume, loadSfx))
+
+    def playMusic(self, path, volume):
+        pygame.mixer.music.load(path)  # streamed while it plays, loading it only opens the file
+        pygame.mixer.music.play(-1)  # -1 will loop the song
+        pygame.mixer.music.set_volume(volume)
+
+
+# ----------------------------------------------------
+# Latency harness
+# ----------------------------------------------------
+def measureLatency(presses=20, buffer=BUFFER, fps=60):
+    """Run the game and press space from another thread at random moments, returns how long each press took
+    to reach Channel.play() in ms and how much silence was trimmed off each sound"""
+    import runnin
+    from inputs import clockMs, playPressing
+
+    game = runnin.Game(fps=fps, audioBuffer=buffer)
+    playTimes = []
+    play = game.audio.play
+
+    def timedPlay(name):
+        if name == "jump":
+            playTimes.append(clockMs())
+        play(name)
+    game.audio.play = timedPlay
+
+    pressTimes = playPressing(game, presses, (0.45, 0.55))  # far enough apart not to be double taps
+
+    # a press the simulation ignored (in the middle of a gravity switch) makes no sound, so every sound is
+    # matched with the last press before it
+    latencies = []
+    for played in playTimes:
+        pressed = max((t for t in pressTimes if t <= played), default=None)
+        if pressed is not None:
+            latencies.append(played - pressed)
+    # run as a script this module is __main__, the game has its own copy of it
+    return latencies, runnin.audio.trimmedMs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how long the space bar takes to make a sound")
+    parser.add_argument("--latency", action="store_true", help="run the latency harness")
+    parser.add_argument("--presses", type=int, default=20)
+    parser.add_argument("--audio-buffer", type=int, default=BUFFER, help="mixer buffer in samples")
+    parser.add_argument("--fps", type=int, default=60)
+    args = parser.parse_args()
+    if not args.latency:
+        parser.error("nothing to do, try --latency")
+
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    from inputs import percentile
+
+    latencies, trimmed = measureLatency(args.presses, args.audio_buffer, args.fps)
+    latencies.sort()
+    bufferMs = args.audio_buffer * 1000 / FREQUENCY
+    p50 = percentile(latencies, 50)
+    p99 = percentile(latencies, 99)
+    print(f"{len(latencies)} presses, key to play() p50 {p50:.2f} ms p99 {p99:.2f} ms")
+    print(f"mixer buffer {args.audio_buffer} samples, {bufferMs:.2f} ms more before it's heard, "
+          f"so about {p50 + bufferMs:.1f} ms typical and {p99 + bufferMs:.1f} ms worst")
+    for name, ms in trimmed.items():
+        print(f"{name}: {ms:.1f} ms of silence trimmed off the start")
@@ -0,0 +1,92 @@
+# Runnin' batch simulation check
+# ----------------------------------------------------
+# batchsim.py is only any use if its runs are the runs GameState plays. This steps a couple hundred seeds through
+# both side by side with the same actions and checks every game matches after every step: score, player,
+# speed, powerups and, every so often, each spike. Exits with 1 on the first step that doesn't. The player is
+# sweep.py's planner, so runs get to the top speed and pick up every kind of powerup, with a random press now
+# and then so gravity switches at odd moments and some runs die.
+#
+#   python batchcheck.py                      200 seeds, 3000 steps
+#   python batchcheck.py --seeds 1000 --steps 6000
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from batchsim import BatchGameState
+from simulation import GameState, SPACE_HELD, SPACE_PRESSED
+from sweep import Planner
+
+SPIKES_EVERY = 30  # steps between spike for spike comparisons, they're the slow part
+
+
+def action(state, player, rand):
+    """What the planner does, with a random press now and then"""
+    act = player(state)
+    if rand.random() < 0.003:
+        act |= SPACE_PRESSED | SPACE_HELD
+    return act
+
+
+def snapshot(state):
+    return (state.score, state.player.rect.y, state.player.yvel, state.player.gravityDown, state.spikeSpeed,
+            state.gameOver, state.extraLife, state.noSpikes, state.powerupText)
+
+
+def batchSnapshot(games, i):
+    return (games.score[i], games.y[i], games.yvel[i], games.gravityDown[i], games.spikeSpeed[i],
+            games.gameOver[i], games.extraLife[i], games.noSpikes[i], games.powerupText(i))
+
+
+def check(seeds, steps):
+    """Step GameState and BatchGameState together, returns None if they agree the whole way, or the first
+    (step, seed, GameState's values, batch values) that doesn't"""
+    states = [GameState(seed) for seed in seeds]
+    players = [Planner() for _ in seeds]
+    rands = [random.Random(seed) for seed in seeds]
+    games = BatchGameState(seeds)
+    for step in range(1, steps + 1):
+        actions = np.array([action(*run) for run in zip(states, players, rands)], np.int64)
+        for state, act in zip(states, actions):
+            state.step(int(act))
+        games.step(actions)
+
+        for i, state in enumerate(states):
+            want = snapshot(state)
+            got = batchSnapshot(games, i)
+            if step % SPIKES_EVERY == 0 or step == steps:
+                want += (sorted((spike.lane, spike.x) for spike in state.spikes),)
+                got += (sorted(games.spikes(i)),)
+            if want != got:
+                return step, seeds[i], want, got
+        if games.gameOver.all():
+            break
+    return None
+
+
+# ----------------------------------------------------
+# Command line
+# ----------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check batchsim.py plays the same runs as GameState")
+    parser.add_argument("--seeds", type=int, default=200, help="how many seeds to play")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--steps", type=int, default=3000, help="steps to play each seed for")
+    args = parser.parse_args()
+
+    seeds = list(range(args.seed, args.seed + args.seeds))
+    start = time.perf_counter()
+    mismatch = check(seeds, args.steps)
+    took = time.perf_counter() - start
+    if mismatch:
+        step, seed, want, got = mismatch
+        print(f"MISMATCH at step {step} of seed {seed}\n  GameState {want}\n  batchsim  {got}")
+        sys.exit(1)
+    print(f"{len(seeds)} seeds x {args.steps} steps match in {took:.1f} s")
+    sys.exit(0)
@@ -0,0 +1,287 @@
+# Runnin' batch simulation
+# ----------------------------------------------------
+# Plays thousands of runs at once for difficulty tuning. Every per-game value from simulation.GameState lives
+# in a NumPy array shaped (n_games, ...) and one step() moves every game forward a frame. For the same seed and
+# the same actions each game ends up exactly where GameState would, spike for spike.
+#
+#   games = BatchGameState(range(10000))
+#   while not games.gameOver.all():
+#       games.step(SPACE_HELD)
+#   print(games.score.mean())
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import random
+
+import numpy as np
+
+from simulation import (
+    WIDTH,
+    HEIGHT,
+    TICK_MS,
+    SPEEDMULTIPLIER,
+    STARTSPEED,
+    MAXSPEED,
+    GRAVITYSWITCH_MS,
+    SPACE_HELD,
+    SPACE_PRESSED,
+    POWERUPKINDS
+)
+from spawns import SPIKE_RULES, POWERUP_AHEAD
+
+MAXLANESPIKES = 24  # spikes in a lane are always 50px apart, so no more than 19 fit between x=-50 and WIDTH
+
+BOT = 0
+TOP = 1
+LANES = ("bot", "top")
+# spawn rule of each lane, batchsim keeps one spawn timer per lane so BatchGameState() needs exactly one
+LANERULES = [[rule for rule in SPIKE_RULES if rule.lane == lane] for lane in LANES]
+RULES = [rules[0] if rules else None for rules in LANERULES]
+FLOODMS = np.array([rule.floodMs if rule else 0 for rule in RULES], np.float64)
+
+# Powerups in the order GameState updates them. The effects are written out for arrays below, the texts
+# and durations come from POWERUPKINDS. A kind batchsim doesn't know would make runs that don't match
+# GameState's, so BatchGameState() refuses to start rather than whenever one first gets picked up.
+KINDNAMES = [kind.name for kind in POWERUPKINDS]
+SUPPORTED = ("heart", "invincible", "moreSpikes", "speedBoost")
+HEART, INVINCIBLE, MORESPIKES, SPEEDBOOST = (KINDNAMES.index(name) if name in KINDNAMES else -1
+                                             for name in SUPPORTED)
+
+POWERUPTEXTS = [""] + [kind.text for kind in POWERUPKINDS]
+
+
+def unsupported():
+    """Why batchsim can't play the game simulation.py describes, or None if it can"""
+    if any(len(rules) != 1 for rules in LANERULES):
+        counts = ", ".join(f"{len(rules)} for {lane}" for lane, rules in zip(LANES, LANERULES))
+        return f"batchsim needs one spawn rule per lane, SPIKE_RULES has {counts}"
+    if sorted(KINDNAMES) != sorted(SUPPORTED):
+        return f"batchsim only knows what {', '.join(SUPPORTED)} do, POWERUPKINDS has {', '.join(KINDNAMES)}"
+    return None
+
+
+def rectRound(x):
+    """Round the way pygame.Rect does when a float is assigned to it, half away from zero"""
+    whole = np.trunc(x)
+    return (whole + np.where(np.abs(x - whole) >= 0.5, np.sign(x), 0)).astype(np.int64)
+
+
+class BatchGameState:
+    """Many runs of Runnin' stepped together. Games that are over stop changing until the next reset()."""
+
+    def __init__(self, seeds):
+        problem = unsupported()
+        if problem:
+            raise ValueError(problem)
+        self.reset(seeds)
+
+    def reset(self, seeds):
+        """Start a new run for every seed, the same seeds and actions always give the same runs"""
+        self.seeds = list(seeds)
+        self.randoms = [random.Random(seed) for seed in self.seeds]
+        n = self.n = len(self.seeds)
+
+        self.tick = np.zeros(n, np.int64)
+        self.score = np.zeros(n, np.int64)
+        self.spikeSpeed = np.full(n, STARTSPEED, np.float64)
+
+        self.extraLife = np.zeros(n, bool)
+        self.noSpikes = np.zeros(n, bool)
+        self.moreSpikes = np.full(n, -1, np.int64)  # the lane being flooded, -1 for none
+        self.powerupTextIndex = np.zeros(n, np.int64)
+
+        self.colliding = np.zeros(n, bool)
+        self.gravityChanging = np.zeros(n, bool)
+        self.gameOver = np.zeros(n, bool)
+        self.lastSpaceMs = np.full(n, -GRAVITYSWITCH_MS, np.float64)
+
+        self.y = np.full(n, HEIGHT // 2, np.int64)
+        self.yvel = np.zeros(n, np.int64)
+        self.gravityDown = np.ones(n, bool)
+
+        # spikes per lane, oldest (leftmost) first, the same order GameState keeps them in
+        self.spikeX = np.zeros((n, 2, MAXLANESPIKES), np.float64)
+        self.spikeLeft = np.zeros((n, 2, MAXLANESPIKES), np.int64)
+        self.spikeAlive = np.zeros((n, 2, MAXLANESPIKES), bool)
+        self.spikeCount = np.zeros((n, 2), np.int64)
+
+        # powerups, drawn from each game's own random in the same order as GameState.reset()
+        kinds = len(POWERUPKINDS)
+        draws = np.array([[rand.randint(*POWERUP_AHEAD) for _ in range(kinds)]
+                          for rand in self.randoms], np.int64).reshape(n, kinds)
+        self.powerupX = WIDTH + draws - STARTSPEED
+        self.powerupStart = np.zeros((n, kinds), np.int64)
+
+        self.spikeDueMs = np.zeros((n, 2), np.float64)
+        for i, rand in enumerate(self.randoms):
+            for rule in SPIKE_RULES:
+                self.spikeDueMs[i, LANES.index(rule.lane)] = rule.first(rand)
+
+    def powerupText(self, i):
+        return POWERUPTEXTS[self.powerupTextIndex[i]]
+
+    def spikes(self, i):
+        """The live spikes of game i as (lane, x) pairs, oldest first in each lane"""
+        return [(LANES[lane], self.spikeX[i, lane, k])
+                for lane in (BOT, TOP)
+                for k in range(MAXLANESPIKES) if self.spikeAlive[i, lane, k]]
+
+    def spikeInterval(self, i, lane):
+        return RULES[lane].interval(self.randoms[i], self.spikeSpeed[i], self.moreSpikes[i] == lane)
+
+    def spawnSpikes(self, active, now):
+        """Restart the timers that fire this frame and add a spike to their lanes if it fits"""
+        due = active[:, None] & (now[:, None] >= self.spikeDueMs)
+        flooded = due & (self.moreSpikes[:, None] == np.arange(2))
+        self.spikeDueMs[flooded] = (now[:, None] + FLOODMS)[flooded]
+
+        # anything that isn't a flood needs a random interval, drawn in the order the timers fired
+        for i in np.flatnonzero((due & ~flooded).any(axis=1)):
+            lanes = [lane for lane in (BOT, TOP) if due[i, lane] and not flooded[i, lane]]
+            lanes.sort(key=lambda lane: (self.spikeDueMs[i, lane], RULES[lane].order))
+            for lane in lanes:
+                self.spikeDueMs[i, lane] = now[i] + self.spikeInterval(i, lane)
+
+        # a spike that would overlap the last one in its lane never gets made
+        count = self.spikeCount
+        tail = np.take_along_axis(self.spikeX, np.maximum(count - 1, 0)[:, :, None], axis=2)[:, :, 0]
+        games, lanes = np.nonzero(due & ((count == 0) | (WIDTH - tail >= 50)))
+        slots = count[games, lanes]
+        if len(slots) and slots.max() >= MAXLANESPIKES:
+            raise RuntimeError("too many spikes in one lane, raise MAXLANESPIKES")
+        self.spikeX[games, lanes, slots] = WIDTH
+        self.spikeLeft[games, lanes, slots] = WIDTH
+        self.spikeAlive[games, lanes, slots] = True
+        count[games, lanes] += 1
+
+    def updatePlayer(self, active, held):
+        y, yvel = self.y, self.yvel
+        np.clip(yvel, -15, 15, out=yvel, where=active)
+
+        gravity = np.where(self.gravityDown, 1, -1)
+        falling = active & ~self.colliding
+        yvel += np.where(falling, gravity, 0)
+        y += np.where(falling, yvel, 0)
+
+        jumping = active & held & self.colliding
+        yvel -= np.where(jumping, 15 * gravity, 0)
+        y += np.where(jumping, yvel, 0)
+
+        yvel[active & ~held & self.colliding] = 0
+
+    def updatePowerups(self, active):
+        y = self.y
+        inReach = (y > HEIGHT / 2 - 50) & (y < HEIGHT / 2 + 25)
+
+        for kind in range(len(POWERUPKINDS)):
+            duration = POWERUPKINDS[kind].duration
+            if kind == INVINCIBLE:
+                over = active & self.noSpikes & (self.score >= self.powerupStart[:, kind] + duration)
+                self.noSpikes[over] = False
+                self.powerupTextIndex[over] = 0
+            elif kind == MORESPIKES:
+                over = active & (self.moreSpikes != -1) & (self.score >= self.powerupStart[:, kind] + duration)
+                self.moreSpikes[over] = -1
+                self.powerupTextIndex[over] = 0
+
+            x = self.powerupX[:, kind]
+            x -= np.where(active, np.trunc(self.spikeSpeed).astype(np.int64), 0)
+
+            hit = active & inReach & (x > 25) & (x < 100)
+            if not hit.any():
+                continue
+            x[hit] = -25
+            self.powerupTextIndex[hit] = kind + 1
+            if kind == HEART:
+                self.extraLife[hit] = True
+            elif kind == INVINCIBLE:
+                self.noSpikes[hit] = True
+                self.powerupStart[hit, kind] = self.score[hit]
+            elif kind == MORESPIKES:
+                self.powerupStart[hit, kind] = self.score[hit]
+                self.moreSpikes[hit] = np.where(self.gravityDown[hit], BOT, TOP)
+            elif kind == SPEEDBOOST:
+                self.spikeSpeed[hit] += 2
+
+    def collidePlatforms(self, active):
+        y = self.y
+        bottom = active & (y > HEIGHT - 100) & (y < HEIGHT)
+        top = active & (y < 50) & (y > -50)
+        touching = bottom | top
+
+        self.colliding[active] = touching[active]
+        self.gravityChanging[touching] = False
+        self.yvel[touching] = 0
+        y[bottom] = HEIGHT - 100
+        y[top] = 50
+
+    def collideSpikes(self, active):
+        y = self.y
+        left = self.spikeLeft
+        near = self.spikeAlive & (left > 0) & (left < 100)
+        near[:, BOT] &= ((y > HEIGHT - 140) & (y < HEIGHT - 40))[:, None]
+        near[:, TOP] &= ((y > 0) & (y < 100))[:, None]
+        near &= active[:, None, None]
+
+        # a player can't reach both lanes at once, so the first spike hit is the oldest one in its lane
+        hitLane = near.any(axis=2)
+        hit = hitLane.any(axis=1)
+        if not hit.any():
+            return
+        lane = np.where(hitLane[:, BOT], BOT, TOP)
+        first = near[np.arange(self.n), lane].argmax(axis=1)
+
+        saved = hit & self.extraLife
+        self.powerupTextIndex[saved] = 0
+        self.extraLife[saved] = False
+        self.spikeAlive[saved, lane[saved], first[saved]] = False
+        self.gameOver |= hit & ~saved
+
+    def updateSpikes(self, active):
+        alive = self.spikeAlive
+        moving = alive & active[:, None, None]
+        self.spikeX -= np.where(moving, self.spikeSpeed[:, None, None], 0)
+        self.spikeLeft[moving] = rectRound(self.spikeX[moving])
+        alive &= self.spikeLeft + 50 > 0
+
+        # squeeze out the spikes that fell off the left edge or got hit, keeping each lane oldest first
+        count = alive.sum(axis=2)
+        if (count != self.spikeCount).any():
+            order = np.argsort(~alive, axis=2, kind="stable")
+            self.spikeAlive = np.take_along_axis(alive, order, axis=2)
+            self.spikeX = np.take_along_axis(self.spikeX, order, axis=2)
+            self.spikeLeft = np.take_along_axis(self.spikeLeft, order, axis=2)
+            self.spikeCount = count
+
+    def step(self, actions=0):
+        """Play one frame of every game still running, actions is one action or one per game"""
+        actions = np.broadcast_to(np.asarray(actions, np.int64), (self.n,))
+        active = ~self.gameOver
+        if not active.any():
+            return
+
+        self.tick += active
+        now = self.tick * TICK_MS
+
+        pressed = active & (actions & SPACE_PRESSED != 0) & ~self.gravityChanging
+        switch = pressed & (now - self.lastSpaceMs < GRAVITYSWITCH_MS)
+        self.gravityDown[switch] = ~self.gravityDown[switch]
+        self.gravityChanging |= switch
+        self.lastSpaceMs[pressed] = now[pressed]
+
+        self.spawnSpikes(active, now)
+
+        self.updatePlayer(active, actions & SPACE_HELD != 0)
+        self.score += active
+        self.updatePowerups(active)
+        self.collidePlatforms(active)
+        self.collideSpikes(active)
+
+        # if invincible powerup is active, kill all spikes
+        self.spikeAlive[active & self.noSpikes] = False
+
+        self.updateSpikes(active)
+
+        speedUp = active & ~(self.spikeSpeed > MAXSPEED)
+        self.spikeSpeed[speedUp] += SPEEDMULTIPLIER
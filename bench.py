@@ -0,0 +1,184 @@
+# Runnin' benchmarks
+# ----------------------------------------------------
+# Runs the real game loop from runnin.py with SDL's dummy video and audio drivers, scripted input and no
+# frame cap, one simulation step per frame, and measures how long the frames take. Each scenario pins the
+# game in one situation so its cost can be compared between builds:
+#
+#   calm        a run held at the starting speed of 6
+#   speedcap    a run held at the speed cap of 18
+#   flood       a More Spikes! flood that never ends
+#   nospikes    a No Spikes! stretch that never ends
+#   title       the title screen sitting there
+#
+#   python bench.py --json before.json
+#   python bench.py --json after.json --compare before.json
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import os
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import pygame
+
+import runnin
+from inputs import percentile, postSpace
+from simulation import MAXSPEED, STARTSPEED
+
+SEED = 52
+
+
+class ScriptedGame(runnin.Game):
+    """The game with the space bar driven by a script instead of the keyboard, goldens.py plays it too"""
+
+    held = False
+
+    def spaceHeld(self):
+        return self.held
+
+
+class BenchGame(ScriptedGame):
+    """Keeps count of the most things drawn in a frame"""
+
+    peakDrawn = 0
+
+    def draw(self, alpha):
+        drawList = self.drawList(alpha)
+        self.peakDrawn = max(self.peakDrawn, len(drawList))
+        self.renderer.present(runnin.currColor, drawList)
+
+
+# Scenarios get the game before each frame, they keep it in the situation being measured. The player can't
+# die in any of them, a spike hit just uses up the extra life that keeps getting handed back.
+def calm(game):
+    game.state.spikeSpeed = STARTSPEED
+    game.state.extraLife = True
+
+
+def speedcap(game):
+    game.state.spikeSpeed = MAXSPEED
+    game.state.extraLife = True
+
+
+def flood(game):
+    game.state.moreSpikes = "bot" if game.state.player.gravityDown else "top"
+    game.state.extraLife = True
+
+
+def nospikes(game):
+    game.state.noSpikes = True
+    game.state.extraLife = True
+
+
+def title(game):
+    game.gameOverTimer = pygame.time.get_ticks()  # holding space never gets past the title screen
+
+
+SCENARIOS = {
+    "calm": calm,
+    "speedcap": speedcap,
+    "flood": flood,
+    "nospikes": nospikes,
+    "title": title,
+}
+
+
+def runScenario(name, frames, dirtyRects=False, textures=False):
+    game = BenchGame(fps=0, dirtyRects=dirtyRects, textures=textures)
+    pin = SCENARIOS[name]
+    if name != "title":
+        game.startRun(SEED)
+    else:
+        game.bgSquares.random.seed(SEED)
+
+    times = []
+    peaks = {"spikes": 0, "bgSquares": 0}
+
+    for frame in range(frames):
+        # jump for a moment every 40 frames and double tap the gravity around every 300
+        game.held = frame % 40 < 3
+        if frame % 300 in (0, 5):
+            postSpace(True)
+            postSpace(False)
+        pin(game)
+
+        start = time.perf_counter()
+        game.handleEvents()
+        game.update(game.inputs.actionFor())
+        game.draw(1)
+        times.append(time.perf_counter() - start)
+
+        if game.gameOver and name != "title":
+            game.startRun(SEED + frame)
+        peaks["spikes"] = max(peaks["spikes"], len(game.state.spikes))
+        peaks["bgSquares"] = max(peaks["bgSquares"], len(game.bgSquares))
+    peaks["drawn"] = game.peakDrawn
+
+    total = sum(times)
+    times.sort()
+    return {
+        "frames": frames,
+        "fps": frames / total,
+        "p50_ms": percentile(times, 50) * 1000,
+        "p99_ms": percentile(times, 99) * 1000,
+        "max_ms": times[-1] * 1000,
+        "peak": peaks,
+        # how much the pools had to make, a run that's settled makes nothing new however long it goes on
+        "pools": {**{f"{lane}Spikes": pool.stats() for lane, pool in game.state.spikePools.items()},
+                  "bgSquares": game.bgSquares.stats()},
+    }
+
+
+# ----------------------------------------------------
+# Command line
+# ----------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Runnin' game loop headless")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS), help="scenarios to run, default all")
+    parser.add_argument("--frames", type=int, default=3000, help="frames per scenario")
+    parser.add_argument("--dirty-rects", action="store_true", help="benchmark the dirty rectangle renderer")
+    parser.add_argument("--textures", action="store_true", help="benchmark the texture renderer")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare against results from an earlier --json")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error("unknown scenarios: " + ", ".join(sorted(unknown)))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["scenarios"]
+
+    results = {}
+    print(f"{'scenario':<10} {'fps':>9} {'p50 ms':>8} {'p99 ms':>8} {'spikes':>7} {'squares':>8} {'made':>5}")
+    for name in args.scenarios:
+        result = results[name] = runScenario(name, args.frames, args.dirty_rects, args.textures)
+        line = (f"{name:<10} {result['fps']:>9.0f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} "
+                f"{result['peak']['spikes']:>7} {result['peak']['bgSquares']:>8} "
+                f"{sum(result['pools'][pool]['created'] for pool in ('botSpikes', 'topSpikes')):>5}")
+        if baseline and name in baseline:
+            line += f"   fps x{result['fps'] / baseline[name]['fps']:.2f}"
+        print(line)
+    pygame.quit()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "pygame": pygame.version.ver,
+                "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "dirtyRects": args.dirty_rects,
+                "textures": args.textures,
+                "scenarios": results,
+            }, f, indent=2)
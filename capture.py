@@ -0,0 +1,150 @@
+# Runnin' frame capture
+# ----------------------------------------------------
+# Records what's drawn. The game thread does as little as it can: the screen's pixels are read through its
+# buffer interface and copied once, as they are, into one of a few buffers made up front. A writer thread takes
+# filled buffers off a queue, turns them into RGB (downsampled if asked) and either streams them out as raw
+# rgb24, one frame after the other, to a file or to another program's stdin, or saves them as PNGs. When
+# every buffer is still waiting to be written the frame is dropped instead, the game never waits on the writer.
+# Every frame has to be the size the first one was, frames from a --textures window that's been resized since
+# are dropped too.
+#
+# PNGs are put together here with zlib instead of pygame.image.save, which keeps hold of the GIL and would
+# slow the game down while it works.
+#
+#   python runnin.py --capture run.rgb                   raw 853x480 rgb24 frames
+#   python runnin.py --capture - | ffmpeg -f rawvideo -pix_fmt rgb24 -s 853x480 -r 60 -i - run.mp4
+#   python runnin.py --capture-pngs shots --capture-every 60 --capture-scale 2
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+
+import numpy as np
+
+
+def pngBytes(rgb):
+    """An (height, width, 3) uint8 array as a PNG file"""
+    height, width, _ = rgb.shape
+    rows = np.empty((height, width * 3 + 1), np.uint8)
+    rows[:, 0] = 0  # no filter on any row
+    rows[:, 1:] = rgb.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.data, 3)) + chunk(b"IEND", b""))
+
+
+class FrameCapture:
+    """Grabs frames with grab(surface) and writes them on another thread, grab() never blocks. Frames go to
+    rawPath (a file, or "-" for stdout) or to numbered PNGs in pngDir. Only every every-th frame is kept, and
+    scale keeps every scale-th pixel each way."""
+
+    def __init__(self, rawPath=None, pngDir=None, every=1, scale=1, buffers=8):
+        if (rawPath is None) == (pngDir is None):
+            raise ValueError("capture to either a raw stream or a folder of PNGs")
+        self.rawPath = rawPath
+        self.pngDir = pngDir
+        self.every = every
+        self.scale = scale
+        self.buffers = buffers
+        self.free = queue.Queue()  # buffers nothing's in
+        self.queue = queue.Queue()  # (frame number, buffer) to write, None to stop
+        self.layout = None  # (width, height, pitch, shifts) of the frames, all of them the same
+        self.frame = 0  # frames offered to grab(), kept or not
+        self.captured = 0
+        self.dropped = 0
+        self.mismatched = 0  # frames dropped for not being the size the first one was, a resized window
+        self.written = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self.work, name="capture", daemon=True)
+        self.thread.start()
+
+    def grab(self, surface):
+        """Copy what's on surface now, unless it isn't one of the frames kept or the writer's behind"""
+        self.frame += 1
+        if (self.frame - 1) % self.every:
+            return
+        if surface.get_bytesize() != 4:
+            surface = surface.convert(32, 0)  # only 32 bit pixels are read straight, nothing the game opens
+        layout = (*surface.get_size(), surface.get_pitch(), surface.get_shifts()[:3])
+        if self.layout is None:
+            self.layout = layout
+            for _ in range(self.buffers):
+                self.free.put(np.empty(surface.get_pitch() * surface.get_height(), np.uint8))
+        elif layout != self.layout:
+            self.mismatched += 1  # a raw stream can't change size halfway through
+            return
+        try:
+            buffer = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        np.copyto(buffer, np.frombuffer(surface.get_view("0"), np.uint8))  # rows of pixels, as they are
+        self.captured += 1
+        self.queue.put((self.frame, buffer))
+
+    def rgb(self, buffer):
+        """The frame in buffer as an (height, width, 3) uint8 array"""
+        width, height, pitch, shifts = self.layout
+        pixels = buffer.view(np.uint32).reshape(height, pitch // 4)[::self.scale, :width:self.scale]
+        rgb = np.empty((*pixels.shape, 3), np.uint8)
+        for channel, shift in enumerate(shifts):
+            rgb[..., channel] = pixels >> shift
+        return rgb
+
+    def work(self):
+        out = None
+        try:
+            if self.rawPath:
+                out = sys.stdout.buffer if self.rawPath == "-" else open(self.rawPath, "wb")
+            else:
+                os.makedirs(self.pngDir, exist_ok=True)
+        except OSError:
+            self.errors += 1
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, buffer = item
+            try:
+                rgb = self.rgb(buffer)
+                self.free.put(buffer)
+                if self.rawPath:
+                    if out is None:
+                        raise OSError(f"couldn't open {self.rawPath}")
+                    out.write(rgb.data)
+                else:
+                    with open(os.path.join(self.pngDir, f"frame{frame:06d}.png"), "wb") as f:
+                        f.write(pngBytes(rgb))
+                self.written += 1
+            except OSError:
+                self.errors += 1  # a missing frame isn't worth crashing the game over
+        if out:
+            try:
+                out.flush()
+                if out is not sys.stdout.buffer:
+                    out.close()
+            except OSError:
+                self.errors += 1
+
+    def close(self, timeout=10):
+        """Write every frame grabbed so far and stop the thread, gives up after timeout seconds"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def report(self):
+        size = "nothing"
+        if self.layout:
+            width, height = self.layout[:2]
+            size = f"{len(range(0, width, self.scale))}x{len(range(0, height, self.scale))}"
+        return (f"captured {self.captured} frames of {size}, wrote {self.written}, dropped {self.dropped} "
+                f"with the writer behind" + (f", {self.mismatched} of another size" if self.mismatched else "")
+                + (f", {self.errors} failed" if self.errors else ""))
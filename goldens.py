@@ -0,0 +1,149 @@
+# Runnin' golden frames
+# ----------------------------------------------------
+# Plays a few scripted, seeded scenes with SDL's dummy drivers and draws every frame through each renderer,
+# then checks the last frame of each scene against a PNG in goldens/. Every renderer has to come out the same
+# as the plain surface one, give or take a little colour rounding where translucent things overlap, so a
+# change to a renderer (or to what the game draws) shows up here before it shows up on someone's screen.
+#
+#   python goldens.py             check every renderer against the goldens
+#   python goldens.py --update    draw the goldens again with the surface renderer, after a change on purpose
+#   python goldens.py --capture frames    also save every 10th frame of each scene, to see where one went wrong
+#
+# The texture renderer is checked with SDL's software renderer at the game's own size, it can only read a
+# frame back when it isn't scaled.
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import os
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import sys
+import tempfile
+
+import numpy as np
+import pygame
+
+import runnin
+from bench import ScriptedGame
+from capture import FrameCapture
+from renderers import SurfaceRenderer, DirtyRectRenderer, TextureRenderer
+from simulation import WIDTH, HEIGHT, SPACE_HELD
+from sweep import policy
+
+GOLDEN_FOLDER = os.path.join(os.path.dirname(os.path.realpath(__file__)), "goldens")
+TOLERANCE = 4  # most any channel of any pixel can be off by, SDL blends text edges a shade differently
+
+
+# Scenes get the game and the step number before each step and return whether space is held. Frames are drawn
+# a third of the way between steps so the interpolation is checked too.
+def title(game, i):
+    return False
+
+
+def run(game, i):
+    if i == 0:
+        game.startRun(7)
+    return bool(policy(game.state))
+
+
+def flood(game, i):
+    if i == 0:
+        game.startRun(11)
+    game.state.moreSpikes = "bot" if game.state.player.gravityDown else "top"
+    game.state.extraLife = True
+    return i % 25 < 3
+
+
+def powerup(game, i):
+    if i == 0:
+        game.startRun(4)
+    game.state.extraLife = True
+    return i % 40 < 3
+
+
+SCENES = {
+    "title": (title, 120),
+    "run": (run, 300),
+    "flood": (flood, 200),
+    "powerup": (powerup, 567),
+}
+
+
+def playScene(game, scene, steps, renderers, capture=None):
+    """Step the scene, drawing every frame with each renderer, returns each renderer's last frame as an
+    array and the most any frame was off from the surface renderer. The surface renderer's frames go to
+    capture too if there is one."""
+    game.gameOver = True
+    game.state.reset(0)
+    game.bgSquares = runnin.BackgroundSquares()
+    game.bgSquares.random.seed(1)
+    for renderer in renderers.values():
+        renderer.invalidate()
+
+    worst = dict.fromkeys(renderers, 0)
+    for i in range(steps):
+        game.held = scene(game, i)
+        game.update(SPACE_HELD if game.held else 0)
+        drawList = game.drawList(1 / 3)
+        frames = {}
+        for name, renderer in renderers.items():
+            renderer.render(runnin.currColor, drawList)
+            frames[name] = pygame.surfarray.array3d(renderer.capture()).astype(np.int16)
+            if capture and name == "surface":
+                capture.grab(renderer.capture())
+            renderer.flip()
+        for name, frame in frames.items():
+            worst[name] = max(worst[name], int(np.abs(frame - frames["surface"]).max()))
+    return frames, worst
+
+
+# ----------------------------------------------------
+# Command line
+# ----------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check every renderer against the golden frames")
+    parser.add_argument("--update", action="store_true", help="redraw the goldens with the surface renderer")
+    parser.add_argument("--capture", metavar="DIR", help="save frames of each scene as PNGs in DIR/<scene>")
+    parser.add_argument("--capture-every", type=int, default=10, metavar="N", help="save every Nth frame")
+    parser.add_argument("scenes", nargs="*", default=list(SCENES), help="scenes to check, default all")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as saveDir:  # no highscore on the title screen
+        game = ScriptedGame(fps=0, saveDir=saveDir)
+        renderers = {
+            "surface": SurfaceRenderer(game.screen),
+            "dirty": DirtyRectRenderer(game.screen.copy()),  # its own screen, it only redraws what changed
+            "texture": TextureRenderer((WIDTH, HEIGHT), "Runnin' goldens", software=True),
+        }
+        os.makedirs(GOLDEN_FOLDER, exist_ok=True)
+        failed = 0
+        for name in args.scenes:
+            scene, steps = SCENES[name]
+            capture = None
+            if args.capture:
+                # plenty of buffers, nothing's waiting on the game here and every frame should make it
+                capture = FrameCapture(pngDir=os.path.join(args.capture, name), every=args.capture_every,
+                                       buffers=steps // args.capture_every + 1)
+            frames, worst = playScene(game, scene, steps, renderers, capture)
+            if capture:
+                capture.close()
+            path = os.path.join(GOLDEN_FOLDER, name + ".png")
+            if args.update:
+                pygame.image.save(pygame.surfarray.make_surface(frames["surface"].astype(np.uint8)), path)
+                print(f"{name}: wrote {path}")
+                continue
+
+            golden = pygame.surfarray.array3d(pygame.image.load(path)).astype(np.int16)
+            for renderer, frame in frames.items():
+                diff = max(worst[renderer], int(np.abs(frame - golden).max()))
+                ok = diff <= TOLERANCE
+                failed += not ok
+                print(f"{name:<8} {renderer:<8} {'ok' if ok else 'FAILED'}  most off by {diff}")
+        game.runLog.close()
+        pygame.quit()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,174 @@
+# Runnin' input
+# ----------------------------------------------------
+# Space bar presses and releases are read off SDL's queue as soon as they come in and stamped with the time
+# they were read, then handed to the simulation step whose slice of time they happened in, not just to
+# whichever step runs next. Jumps and gravity switches land on the same tick however the frames are paced,
+# and a tap that's let go before the next frame still counts. The game loop waits for its next frame in
+# wait(), which wakes up for input instead of sleeping through it. pygame doesn't pass on SDL's own event
+# timestamps, so a press that comes in while a frame is being drawn is stamped when the frame is done.
+#
+# Every press records how long it took from being read to the step that used it running.
+#
+#   python inputs.py --latency --load 30     press space from another thread while frames take 30 ms longer
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import argparse
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import pygame
+from pygame.locals import KEYDOWN, KEYUP, K_SPACE
+
+from simulation import SPACE_HELD, SPACE_PRESSED
+
+
+def clockMs():
+    return time.perf_counter() * 1000
+
+
+class InputLayer:
+    """Timestamped space bar input, actionFor() hands out the action bits for one simulation step"""
+
+    def __init__(self, key=K_SPACE, maxPresses=256):
+        self.key = key
+        self.events = []  # everything read since the last take(), for the game to go through
+        self.pending = deque()  # (ms read, down) changes to the key not handed to a step yet
+        self.held = False  # as of the last step handed out
+        self.presses = deque(maxlen=maxPresses)  # (ms read, ms its step ran)
+
+    def read(self, events):
+        now = clockMs()
+        for e in events:
+            if e.type in (KEYDOWN, KEYUP) and e.key == self.key:
+                self.pending.append((now, e.type == KEYDOWN))
+            elif e.type == pygame.WINDOWFOCUSLOST:
+                self.pending.append((now, False))  # the key up would go to some other window
+            self.events.append(e)
+
+    def poll(self):
+        self.read(pygame.event.get())
+
+    def wait(self, untilMs):
+        """Sleep until untilMs, reading input the moment it comes in"""
+        while True:
+            left = untilMs - clockMs()
+            if left <= 0:
+                return
+            e = pygame.event.wait(max(1, int(left)))
+            if e.type != pygame.NOEVENT:
+                self.read([e])
+
+    def take(self):
+        """Every event read since the last take()"""
+        events, self.events = self.events, []
+        return events
+
+    def actionFor(self, endMs=math.inf):
+        """Action bits for the step that ends at endMs, from every change to the key read before then. A press
+        counts as held for its step even if it was let go again before the step ended. A step only gets one
+        press, a second one read before it ran is left for the next step instead of being lost in the first."""
+        action = SPACE_HELD if self.held else 0
+        now = clockMs()
+        pending = self.pending
+        while pending and pending[0][0] < endMs:
+            ms, down = pending[0]
+            if down and not self.held:
+                if action & SPACE_PRESSED:
+                    break
+                action |= SPACE_PRESSED | SPACE_HELD
+                self.presses.append((ms, now))
+            pending.popleft()
+            self.held = down
+        return action
+
+    def stats(self):
+        """Read to step latency of the recent presses in ms"""
+        latencies = sorted(stepMs - readMs for readMs, stepMs in self.presses)
+        if not latencies:
+            return None
+        return {"presses": len(latencies), "p50": percentile(latencies, 50), "p99": percentile(latencies, 99),
+                "max": latencies[-1]}
+
+
+def percentile(sortedValues, p):
+    return sortedValues[min(len(sortedValues) - 1, len(sortedValues) * p // 100)]
+
+
+# ----------------------------------------------------
+# Latency harness
+# ----------------------------------------------------
+def postSpace(down):
+    """Post a space bar press or release the way SDL would"""
+    pygame.event.post(pygame.event.Event(KEYDOWN if down else KEYUP, key=K_SPACE, mod=0, unicode=" ", scancode=44))
+
+
+def playPressing(game, presses, gap):
+    """Start a run and play it while another thread presses and lets go of space presses times, a random
+    gap (low, high) seconds apart, then quits. Returns the clockMs() of each press."""
+    pressTimes = []
+
+    def presser():
+        time.sleep(0.5)
+        for _ in range(presses):
+            time.sleep(random.uniform(*gap))
+            pressTimes.append(clockMs())
+            postSpace(True)
+            time.sleep(random.uniform(0.01, 0.08))
+            postSpace(False)
+        time.sleep(0.2)
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    threading.Thread(target=presser, daemon=True).start()
+    game.startRun(1)
+    game.run()
+    return pressTimes
+
+
+def measureLatency(presses=30, loadMs=0, fps=60):
+    """Run the game with every frame loadMs slower and press space from another thread, returns for each press
+    how long it took to be read and how long from pressing it to the step that used it running, in ms"""
+    import runnin
+
+    class LoadedGame(runnin.Game):
+        def update(self, action):
+            self.state.extraLife = True  # never die, every press has to land in a run
+            super().update(action)
+
+        def draw(self, alpha):
+            super().draw(alpha)
+            end = time.perf_counter() + loadMs / 1000
+            while time.perf_counter() < end:
+                pass  # busy, like a slow frame would be
+
+    game = LoadedGame(fps=fps)
+    pressTimes = playPressing(game, presses, (0.15, 0.3))
+
+    read = [readMs - pressed for pressed, (readMs, _) in zip(pressTimes, game.inputs.presses)]
+    total = [stepMs - pressed for pressed, (_, stepMs) in zip(pressTimes, game.inputs.presses)]
+    return read, total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how long a space press takes to reach the simulation")
+    parser.add_argument("--latency", action="store_true", help="run the latency harness")
+    parser.add_argument("--presses", type=int, default=30)
+    parser.add_argument("--load", type=float, default=0, help="ms of extra work every frame")
+    parser.add_argument("--fps", type=int, default=60)
+    args = parser.parse_args()
+    if not args.latency:
+        parser.error("nothing to do, try --latency")
+
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    read, total = measureLatency(args.presses, args.load, args.fps)
+    read.sort()
+    total.sort()
+    print(f"{len(total)} presses at {args.fps} fps with {args.load:g} ms of load per frame")
+    print(f"pressed to read      p50 {percentile(read, 50):6.2f} ms  p99 {percentile(read, 99):6.2f} ms")
+    print(f"pressed to its step  p50 {percentile(total, 50):6.2f} ms  p99 {percentile(total, 99):6.2f} ms")
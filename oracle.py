@@ -0,0 +1,298 @@
+# Runnin' solvability oracle
+# ----------------------------------------------------
+# Whether a stretch of spikes can be got through at all, by anyone. The spikes only matter through which
+# lanes have a spike over the player on each step, so a window of obstacles comes down to a danger mask per
+# step, and the player to a handful of small numbers: (y, yvel, gravityDown, colliding, gravityChanging, tick
+# of the last press). The search tries doing nothing, holding space and pressing space on every step, depth
+# first, and remembers every (step, player) it has already seen fail, so no state is searched twice. Once no
+# spike is left ahead the window is passed. Whole windows are cached too, generated patterns repeat a lot.
+#
+# The last press is kept as a tick because the game compares press times in float ms, two presses 24 steps
+# apart switch the gravity on some ticks and not on others, so a window is always checked from a given tick.
+#
+# The physics are the same integer maths as batchsim.py and end up exactly where GameState does. Powerups
+# aren't part of it, a heart would make anything passable once.
+#
+#   oracle = Oracle()
+#   oracle.passable(dangerFromState(state, 120), playerState(state), state.tick)
+#
+#   python oracle.py --patterns 200      check generated pattern runs can be finished, and time it
+#   python oracle.py --floods            which speeds a More Spikes! flood can be lived through at
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import argparse
+import math
+import sys
+import time
+from collections import Counter, OrderedDict
+
+from simulation import (
+    WIDTH,
+    HEIGHT,
+    TICK_MS,
+    STARTSPEED,
+    SPEEDMULTIPLIER,
+    MAXSPEED,
+    GRAVITYSWITCH_MS,
+    SPACE_HELD,
+    SPACE_PRESSED,
+    GameState,
+)
+
+BOT = 1  # danger mask bits
+TOP = 2
+LANEBITS = {"bot": BOT, "top": TOP}
+
+SWITCH_STEPS = math.ceil(GRAVITYSWITCH_MS / TICK_MS) + 1  # presses further apart than this never switch
+ACTIONS = (0, SPACE_HELD, SPACE_HELD | SPACE_PRESSED)  # what the input layer can hand a step
+
+# (y, yvel, gravityDown, colliding, gravityChanging, tick of the last press or None if it can't matter)
+STANDING = (HEIGHT - 100, 0, True, True, False, None)
+HANGING = (50, 0, False, True, False, None)
+
+
+def playerState(state):
+    """The oracle's player state for where a GameState is now"""
+    player = state.player
+    lastPress = round(state.lastSpaceMs / TICK_MS)
+    if state.tick - lastPress >= SWITCH_STEPS:
+        lastPress = None
+    return (player.rect.y, player.yvel, player.gravityDown, state.colliding, state.gravityChanging, lastPress)
+
+
+def advance(player, action, danger, tick):
+    """Where the step that makes it tick with action leaves player, or None if a spike got it"""
+    y, yvel, down, colliding, changing, lastPress = player
+    if lastPress is not None and tick - lastPress >= SWITCH_STEPS:
+        lastPress = None  # forget it, so states that can't tell the difference are the same state
+    if action & SPACE_PRESSED and not changing:
+        if lastPress is not None and tick * TICK_MS - lastPress * TICK_MS < GRAVITYSWITCH_MS:
+            down = not down
+            changing = True
+        lastPress = tick
+
+    # Player.update
+    gravity = 1 if down else -1
+    if yvel > 15:
+        yvel = 15
+    elif yvel < -15:
+        yvel = -15
+    if not colliding:
+        yvel += gravity
+        y += yvel
+    if action & SPACE_HELD and colliding:
+        yvel -= 15 * gravity
+        y += yvel
+    elif colliding:
+        yvel = 0
+
+    # platforms
+    if HEIGHT - 100 < y < HEIGHT:
+        y, yvel, colliding, changing = HEIGHT - 100, 0, True, False
+    elif -50 < y < 50:
+        y, yvel, colliding, changing = 50, 0, True, False
+    else:
+        colliding = False
+
+    if danger & BOT and HEIGHT - 140 < y < HEIGHT - 40 or danger & TOP and 0 < y < 100:
+        return None
+    return y, yvel, down, colliding, changing, lastPress
+
+
+def rectRound(x):
+    """Round the way pygame.Rect does when a float is assigned to it, half away from zero"""
+    whole = int(x)
+    return whole + (1 if x - whole >= 0.5 else -1 if whole - x >= 0.5 else 0)
+
+
+def danger(spikes, steps, speed=STARTSPEED, speedMultiplier=SPEEDMULTIPLIER, maxSpeed=MAXSPEED,
+           floodLane=None):
+    """Danger mask of each of the next steps. spikes is (lane, x) for spikes already out and (lane, None, step)
+    for ones that spawn on a later step (1 is the next one), speed is the spike speed now. A flooded lane
+    gets a spike every step there's room, like More Spikes! does."""
+    lanes = {"bot": [], "top": []}
+    later = []
+    for spike in spikes:
+        if spike[1] is None:
+            later.append((spike[2], spike[0]))
+        else:
+            lanes[spike[0]].append(spike[1])
+    later.sort(key=lambda spawn: spawn[0])
+
+    masks = bytearray(steps)
+    nextSpawn = 0
+    for step in range(1, steps + 1):
+        if not (lanes["bot"] or lanes["top"] or floodLane or nextSpawn < len(later)):
+            break  # nothing left to come, the rest is all safe
+        due = []
+        while nextSpawn < len(later) and later[nextSpawn][0] <= step:
+            due.append(later[nextSpawn][1])
+            nextSpawn += 1
+        if floodLane:
+            due.append(floodLane)
+        for laneName in due:
+            lane = lanes[laneName]
+            if not (lane and WIDTH - lane[-1] < 50):  # GameState skips a spike that would overlap
+                lane.append(WIDTH)
+
+        mask = 0
+        for laneName, lane in lanes.items():
+            for x in lane:  # oldest first, so the ones that can be over the player are at the front
+                left = rectRound(x)
+                if left >= 100:
+                    break
+                if left > 0:
+                    mask |= LANEBITS[laneName]
+                    break
+        masks[step - 1] = mask
+
+        for lane in lanes.values():
+            if lane:
+                lane[:] = [x - speed for x in lane]
+                while lane and rectRound(lane[0]) + 50 <= 0:
+                    del lane[0]
+        if not speed > maxSpeed:
+            speed += speedMultiplier
+    return bytes(masks)
+
+
+def dangerFromState(state, steps, spawns=()):
+    """Danger of the next steps of a GameState from the spikes already out, plus any (step, lane) spawns"""
+    spikes = [(spike.lane, spike.x) for spike in state.spikes]
+    spikes += [(lane, None, step) for step, lane in spawns]
+    return danger(spikes, steps, state.spikeSpeed, state.speedMultiplier, state.maxSpeed, state.moreSpikes)
+
+
+class Oracle:
+    """Answers whether windows of danger can be lived through, remembering the answers"""
+
+    def __init__(self, cacheSize=100000):
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()  # (start, tick, danger) -> (passable, reached), least recently used first
+        self.searched = 0  # player states looked at, over every search
+        self.hits = 0
+        self.reached = 0  # furthest step the last answer got a player alive to, cached or not
+
+    def passable(self, danger, start=STANDING, tick=0):
+        """Whether some way of pressing space gets a player starting at start on tick through every step of
+        danger"""
+        key = (start, tick, danger)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            result, self.reached = self.cache[key]
+            return result
+        result = self.path(danger, start, tick) is not None
+        self.cache[key] = (result, self.reached)
+        if len(self.cache) > self.cacheSize:
+            self.cache.popitem(last=False)
+        return result
+
+    def path(self, danger, start=STANDING, tick=0):
+        """The actions that get through danger from start (up to the last spike), or None if nothing does"""
+        lastDanger = len(danger.rstrip(b"\0")) - 1
+        failed = set()  # (step, player) that every action from dies
+        stack = [(0, start, iter(ACTIONS))]
+        actions = []
+        searched = 0
+        reached = 0
+        while stack:
+            step, player, options = stack[-1]
+            if step > reached:
+                reached = step
+            if step > lastDanger:
+                self.searched += searched
+                self.reached = reached
+                return actions
+            for action in options:
+                if action == ACTIONS[2] and player[4]:
+                    continue  # presses do nothing while the gravity's changing, same as holding
+                nextPlayer = advance(player, action, danger[step], tick + step + 1)
+                if nextPlayer is None or (step + 1, nextPlayer) in failed:
+                    continue
+                searched += 1
+                stack.append((step + 1, nextPlayer, iter(ACTIONS)))
+                actions.append(action)
+                break
+            else:
+                failed.add((step, player))
+                stack.pop()
+                if actions:
+                    actions.pop()
+        self.searched += searched
+        self.reached = reached
+        return None
+
+
+# ----------------------------------------------------
+# Checks
+# ----------------------------------------------------
+def patternRun(seed, steps):
+    """The spawns of a generated pattern run as (step, lane), and which shape each step is in"""
+    from patterns import PatternGenerator
+
+    generator = PatternGenerator(seed)
+    spawns = []
+    shapes = []  # (first step, shape name)
+    while not shapes or generator.startMs < steps * TICK_MS:
+        startMs = generator.startMs
+        _, segment = generator.segment()
+        shapes.append((math.ceil(startMs / TICK_MS), generator.shape))
+        spawns += [(max(1, math.ceil(dueMs / TICK_MS)), lane) for dueMs, lane in segment]
+    return spawns, shapes
+
+
+def checkPatterns(runs, steps, seed):
+    """Search generated pattern runs from the start, returns how many runs, the shapes that blocked the ones
+    nobody can get through, every shape seen and how long it took"""
+    oracle = Oracle()
+    blocked = Counter()
+    seen = Counter()
+    state = GameState()
+    state.reset(seed)
+    begin = playerState(state)  # in the middle of the screen, falling onto the floor
+    start = time.perf_counter()
+    for run in range(seed, seed + runs):
+        spawns, shapes = patternRun(run, steps)
+        seen.update(name for step, name in shapes if step < steps)
+        # speed goes up as if nothing was picked up, from where the player is when a run starts
+        masks = danger([(lane, None, step) for step, lane in spawns], steps)
+        if not oracle.passable(masks, begin):
+            # the spike that got every way through is a little after the furthest anyone got
+            blocked[next(name for step, name in reversed(shapes) if step <= oracle.reached + 1)] += 1
+    return runs, blocked, seen, time.perf_counter() - start, oracle
+
+
+def checkFloods(steps, speeds):
+    """Whether a player standing in a lane that starts flooding can get out of it, at each speed"""
+    oracle = Oracle()
+    results = []
+    for speed in speeds:
+        masks = danger([], steps, speed, 0, speed, floodLane="bot")
+        results.append((speed, oracle.passable(masks, STANDING)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check whether stretches of spikes can be got through")
+    parser.add_argument("--patterns", type=int, metavar="RUNS", help="check this many generated pattern runs")
+    parser.add_argument("--steps", type=int, default=3600, help="steps of each pattern run")
+    parser.add_argument("--window", type=int, default=300, help="steps of each flood")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--floods", action="store_true", help="check More Spikes! floods at every speed")
+    args = parser.parse_args()
+    if not args.patterns and not args.floods:
+        parser.error("nothing to do, try --patterns 100 or --floods")
+
+    if args.patterns:
+        runs, blocked, seen, took, oracle = checkPatterns(args.patterns, args.steps, args.seed)
+        print(f"{runs} runs of {args.steps} steps in {took:.2f} s, {runs * args.steps / took:.0f} steps/s, "
+              f"{oracle.searched} states searched, {sum(blocked.values())} impassable")
+        for shape, count in seen.most_common():
+            print(f"{shape:<10} {count:>7} segments  blocked {blocked[shape]:>4} runs")
+    if args.floods:
+        for speed, ok in checkFloods(args.window, range(STARTSPEED, MAXSPEED + 1)):
+            print(f"speed {speed:>2}: flood on the floor {'can' if ok else 'CAN NOT'} be got out of")
+    sys.exit(0)
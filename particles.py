@@ -0,0 +1,115 @@
+# Runnin' background particles
+# ----------------------------------------------------
+# The faint squares drifting behind the game. They used to be a sprite with its own surface each, now they're
+# rows in a few flat arrays and every square of the same size and alpha shares one surface, so drawing them
+# is a single batch of blits however many there are. Sizes and alphas are rounded to a few steps, so there
+# are only a few dozen of those surfaces, each converted to the display's format once when it's made.
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import random
+
+import numpy as np
+import pygame
+
+from simulation import WIDTH, HEIGHT, TICK_MS, SPEEDMULTIPLIER
+
+WHITE = (255, 255, 255)
+
+SIZE_STEP = 5  # squares come in sizes and alphas this far apart, so only a few dozen surfaces are ever made
+ALPHA_STEP = 4
+
+squareSurfaces = {}
+
+
+def bucket(value, step):
+    """value rounded to a multiple of step, never below step"""
+    return max(step, round(value / step) * step)
+
+
+def squareSurface(size, alpha):
+    key = (bucket(size, SIZE_STEP), bucket(alpha, ALPHA_STEP))
+    if key not in squareSurfaces:
+        surf = pygame.Surface((key[0], key[0]))
+        if pygame.display.get_surface():
+            surf = surf.convert()  # the display's pixel format, so blits never convert it again
+        surf.fill(WHITE)
+        surf.set_alpha(key[1])  # after convert(), which doesn't keep it
+        squareSurfaces[key] = surf
+    return squareSurfaces[key]
+
+
+class BackgroundSquares:
+    """All the background squares, one slot in each array per square, live ones packed at the front"""
+
+    def __init__(self, spawnMs=150, capacity=64):
+        self.spawnMs = spawnMs
+        self.random = random.Random()
+        self.sinceSpawnMs = 0
+        self.count = 0
+        self.highWater = 0
+
+        self.x = np.zeros(capacity, np.int64)
+        self.lastX = np.zeros(capacity, np.int64)
+        self.y = np.zeros(capacity, np.int64)
+        self.size = np.zeros(capacity, np.int64)
+        self.alpha = np.zeros(capacity, np.int64)
+        self.speed = np.zeros(capacity, np.float64)
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        for name in ("x", "lastX", "y", "size", "alpha", "speed"):
+            old = getattr(self, name)
+            new = np.zeros(len(old) * 2, old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def spawn(self):
+        if self.count == len(self.x):
+            self.grow()
+        i = self.count
+        self.size[i] = bucket(self.random.randint(40, 60), SIZE_STEP)  # the size of the surface it's drawn with
+        self.alpha[i] = bucket(self.random.randint(1, 25), ALPHA_STEP)
+        self.speed[i] = self.random.randint(1, 3)
+        self.y[i] = self.random.randint(50, HEIGHT - 50)
+        self.x[i] = self.lastX[i] = WIDTH
+        self.count += 1
+        if self.count > self.highWater:
+            self.highWater = self.count
+
+    def stats(self):
+        """Slot counters like Pool.stats(), with surfaces, the shared square surfaces made so far, in place of
+        created. The arrays only ever grow when highWater does."""
+        return {"live": self.count, "free": len(self.x) - self.count, "highWater": self.highWater,
+                "surfaces": len(squareSurfaces)}
+
+    def update(self):
+        """Make new squares on schedule and move every square one step left, each one speeding up slowly"""
+        self.sinceSpawnMs += TICK_MS
+        while self.sinceSpawnMs >= self.spawnMs:
+            self.sinceSpawnMs -= self.spawnMs
+            self.spawn()
+
+        n = self.count
+        self.speed[:n] += SPEEDMULTIPLIER
+
+        keep = self.x[:n] + self.size[:n] > 0
+        if not keep.all():
+            n = self.count = int(keep.sum())
+            for name in ("x", "y", "size", "alpha", "speed"):
+                arr = getattr(self, name)
+                arr[:n] = arr[:len(keep)][keep]
+
+        self.lastX[:n] = self.x[:n]
+        self.x[:n] -= self.speed[:n].astype(np.int64)  # whole pixels only, like Rect.move_ip
+
+    def drawList(self, alpha):
+        """(surface, rect) pairs for every square, alpha is how far we are between the last step and the next"""
+        n = self.count
+        xs = np.rint(self.lastX[:n] + (self.x[:n] - self.lastX[:n]) * alpha).astype(np.int64)
+        return [(squareSurface(size, a), (x, y, size, size))
+                for x, y, size, a in zip(xs.tolist(), self.y[:n].tolist(),
+                                         self.size[:n].tolist(), self.alpha[:n].tolist())]
@@ -0,0 +1,208 @@
+# Runnin' spike patterns
+# ----------------------------------------------------
+# Instead of drawing each spike's gap as the last one spawns, a worker thread writes the run a few seconds
+# ahead of the player as segments: a short stretch of spikes that's either random gaps like the spawn rules
+# make, or one of a few hand made shapes (stairs, a row on one side, a breather). Which one, and how tight
+# its gaps are, goes by how fast spikes are expected to be by the time it comes up. The simulation only pops
+# finished segments off a bounded buffer.
+#
+# Everything comes from a seed drawn from the run's own Random, so a run is still decided by its seed. If
+# the worker ever falls behind, the next segment is made on the spot from the same generator, exactly as the
+# worker would have made it.
+#
+#   state = GameState(spawner=PatternSpawner())
+#   python runnin.py --patterns
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import random
+import threading
+from collections import deque
+
+from simulation import TICK_MS, STARTSPEED, SPEEDMULTIPLIER, MAXSPEED
+from spawns import SPIKE_TIERS, POWERUP_AHEAD
+
+SEGMENT_MS = 2000  # how long a stretch of random gaps lasts
+FIRST_MS = (600, 1000)  # before the first spike of a run
+
+# Hand made shapes, each a list of (lane, gap) where gap is how far between the shortest and longest gap of
+# the speed tier to wait after the spike before. A lane of None is just a wait.
+SHAPES = {
+    "stairs": (("bot", 0.6), ("top", 0.6), ("bot", 0.6), ("top", 0.6)),
+    "row": (("bot", 0.2), ("bot", 0.2), ("bot", 0.2)),
+    "ceiling": (("top", 0.2), ("top", 0.2), ("top", 0.2)),
+    "zigzag": (("bot", 1.0), ("top", 0.1), ("bot", 1.0), ("top", 0.1)),
+    "breather": ((None, 1.0), (None, 1.0)),
+}
+
+# How often each shape comes up in each speed tier, in the same order as SPIKE_TIERS
+SHAPE_WEIGHTS = (
+    {"random": 4, "stairs": 2, "row": 2, "ceiling": 1, "zigzag": 2, "breather": 1},
+    {"random": 4, "stairs": 2, "row": 1, "ceiling": 1, "zigzag": 1, "breather": 1},
+    {"random": 6, "stairs": 1, "row": 1, "ceiling": 1, "breather": 1},
+)
+
+
+def expectedSpeed(ms, speedMultiplier=SPEEDMULTIPLIER, maxSpeed=MAXSPEED):
+    """How fast spikes are ms into a run if no powerup changes it"""
+    return min(STARTSPEED + speedMultiplier * ms / TICK_MS, maxSpeed)
+
+
+class PatternGenerator:
+    """Makes one run's segments in order, the same seed always makes the same ones"""
+
+    def __init__(self, seed, speedMultiplier=SPEEDMULTIPLIER, maxSpeed=MAXSPEED, tiers=SPIKE_TIERS,
+                 shapes=SHAPES, weights=SHAPE_WEIGHTS):
+        self.random = random.Random(seed)
+        self.speedMultiplier = speedMultiplier
+        self.maxSpeed = maxSpeed
+        self.tiers = tiers
+        self.shapes = shapes
+        self.weights = weights
+        self.startMs = 0
+        self.shape = None  # what the last segment was, "random" or one of shapes
+
+    def tier(self, ms):
+        speed = expectedSpeed(ms, self.speedMultiplier, self.maxSpeed)
+        for i, (above, _, _) in enumerate(self.tiers):
+            if speed > above:
+                return i
+        raise ValueError(f"no spawn tier for speed {speed}")
+
+    def powerupPositions(self, count):
+        return tuple(self.random.randint(*POWERUP_AHEAD) for _ in range(count))
+
+    def segment(self):
+        """(end ms, ((due ms, lane), ...)) for the next stretch of the run, spawns in order"""
+        rand = self.random
+        start = self.startMs
+        if start == 0:
+            start = rand.randint(*FIRST_MS)
+        tier = self.tier(start)
+        _, low, high = self.tiers[tier]
+        names, weights = zip(*self.weights[tier].items())
+        name = self.shape = rand.choices(names, weights)[0]
+
+        spawns = []
+        if name == "random":
+            # each lane on its own, like the spawn rules
+            for lane in ("bot", "top"):
+                t = start + rand.randint(0, high)
+                while t < start + SEGMENT_MS:
+                    spawns.append((t, lane))
+                    t += rand.randint(low, high)
+            spawns.sort()
+            end = start + SEGMENT_MS
+        else:
+            t = start
+            for lane, gap in self.shapes[name]:
+                if lane:
+                    spawns.append((t, lane))
+                t += low + gap * (high - low)
+            end = t
+        self.startMs = end
+        return end, tuple(spawns)
+
+
+class PatternFeed:
+    """A worker thread keeping up to size segments of the current run made ahead of time"""
+
+    def __init__(self, size=8, **generatorArgs):
+        self.size = size
+        self.generatorArgs = generatorArgs
+        self.generator = None
+        self.buffer = deque()
+        self.condition = threading.Condition()  # guards buffer and generator
+        self.making = threading.Lock()  # held while a segment is being made, so they come out in order
+        self.misses = 0  # pops that found nothing made and made it themselves
+        self.closed = False
+        self.thread = threading.Thread(target=self.work, name="patterns", daemon=True)
+        self.thread.start()
+
+    def restart(self, seed, powerups=0):
+        """Throw away what's made and start on a new run, returns where its powerups go"""
+        generator = PatternGenerator(seed, **self.generatorArgs)
+        positions = generator.powerupPositions(powerups)
+        with self.condition:
+            self.generator = generator
+            self.buffer.clear()
+            self.condition.notify()
+        return positions
+
+    def work(self):
+        while True:
+            with self.condition:
+                while not self.closed and (self.generator is None or len(self.buffer) >= self.size):
+                    self.condition.wait()
+                if self.closed:
+                    return
+            with self.making:
+                generator = self.generator
+                segment = generator.segment()
+                with self.condition:
+                    if generator is self.generator:  # not for a run that's been restarted since
+                        self.buffer.append(segment)
+
+    def pop(self):
+        with self.condition:
+            if self.buffer:
+                segment = self.buffer.popleft()
+                self.condition.notify()
+                return segment
+        with self.making:
+            with self.condition:
+                if self.buffer:  # the worker was just finishing it
+                    segment = self.buffer.popleft()
+                    self.condition.notify()
+                    return segment
+            self.misses += 1
+            return self.generator.segment()
+
+    def close(self, timeout=2):
+        """Stop the worker thread, pop() still works after but makes every segment itself"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(timeout)
+
+
+class PatternSpawner:
+    """Plays back a PatternFeed's segments, in place of a SpawnScheduler"""
+
+    def __init__(self, feed=None):
+        self.feed = feed or PatternFeed()
+        self.spawns = ()
+        self.index = 0
+        self.endMs = 0
+
+    def reset(self, rand, powerups=0):
+        positions = self.feed.restart(rand.getrandbits(64), powerups)
+        self.spawns = ()
+        self.index = 0
+        self.endMs = 0
+        return list(positions)
+
+    def due(self, now, rand, speed, floodLane):
+        """Lanes that spawn at sim time now. A flooded lane spawns every step, as it does with the rules."""
+        lanes = []
+        while True:
+            if self.index == len(self.spawns):
+                if now < self.endMs:
+                    break
+                self.endMs, self.spawns = self.feed.pop()
+                self.index = 0
+                continue
+            dueMs, lane = self.spawns[self.index]
+            if dueMs > now:
+                break
+            self.index += 1
+            if lane != floodLane:
+                lanes.append(lane)
+        if floodLane:
+            lanes.append(floodLane)
+        return lanes
+
+    def pending(self):
+        """(due ms, lane) of what's left of the segment being played"""
+        return list(self.spawns[self.index:])
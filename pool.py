@@ -0,0 +1,35 @@
+# Runnin' object pool
+# ----------------------------------------------------
+# Things that are made and thrown away many times a second (spikes during a More Spikes! flood especially)
+# are handed back to a pool when they die and handed out again for the next one, so a long run settles into
+# making nothing new at all. The counters are there to check that it does.
+
+
+class Pool:
+    """Hands out recycled objects, only calling factory when none are free"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.free = []
+        self.live = 0
+        self.highWater = 0  # the most objects that were out at once
+        self.created = 0
+
+    def acquire(self):
+        if self.free:
+            obj = self.free.pop()
+        else:
+            obj = self.factory()
+            self.created += 1
+
+        self.live += 1
+        if self.live > self.highWater:
+            self.highWater = self.live
+        return obj
+
+    def release(self, obj):
+        self.live -= 1
+        self.free.append(obj)
+
+    def stats(self):
+        return {"live": self.live, "free": len(self.free), "highWater": self.highWater, "created": self.created}
@@ -0,0 +1,109 @@
+# Runnin' profiler
+# ----------------------------------------------------
+# Times each phase of a frame so a hitch can be pinned on something: waiting on the clock, the event queue,
+# the simulation, the background squares, building the draw list, blitting it, or flipping the display.
+# The last few seconds of frames are kept in a ring buffer that can be saved as CSV or JSON, and F3 in game
+# shows a summary of them on screen. With the profiler off the game loop only pays for a few `if`s.
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+PHASES = ("wait", "events", "sim", "particles", "drawlist", "blit", "flip")
+COUNTS = ("steps", "spikes", "bgSquares", "drawn")
+COLUMNS = ("frame",) + tuple(phase + "_ms" for phase in PHASES) + COUNTS
+
+
+class Profiler:
+    """Phase timings for the last size frames, call mark(phase) at the end of each phase"""
+
+    def __init__(self, size=600):
+        self.frames = deque(maxlen=size)
+        self.frame = 0
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.last = time.perf_counter()
+
+    def begin(self):
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        """Charge the time since the last mark to phase, a phase can be marked more than once a frame"""
+        now = time.perf_counter()
+        self.times[phase] += now - self.last
+        self.last = now
+
+    def end(self, steps, spikes, bgSquares, drawn):
+        self.frame += 1
+        self.frames.append((self.frame,) + tuple(round(self.times[phase] * 1000, 4) for phase in PHASES)
+                           + (steps, spikes, bgSquares, drawn))
+
+    def rows(self):
+        return [dict(zip(COLUMNS, frame)) for frame in self.frames]
+
+    def summary(self, frames=60):
+        """Average and worst of every column over the last few frames"""
+        recent = list(self.frames)[-frames:]
+        if not recent:
+            return {}
+        return {column: (sum(values) / len(values), max(values))
+                for column, values in zip(COLUMNS, zip(*recent))}
+
+    def save(self, path):
+        """Write the buffer to path, JSON if it ends in .json and CSV otherwise"""
+        with open(path, "w", newline="") as f:
+            if path.endswith(".json"):
+                json.dump(self.rows(), f, indent=1)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(COLUMNS)
+                writer.writerows(self.frames)
+
+
+class ProfilerHud:
+    """The F3 overlay, redrawn a few times a second so it doesn't cost much itself"""
+
+    def __init__(self, profiler, font, refreshMs=250, inputs=None):
+        self.profiler = profiler
+        self.inputs = inputs  # an InputLayer, adds a line for how long presses take to reach the simulation
+        self.font = font
+        self.refreshMs = refreshMs
+        self.lastRefresh = -refreshMs
+        self.surf = None
+
+    def refresh(self):
+        summary = self.profiler.summary()
+        if not summary:
+            return
+        frameMs = sum(summary[phase + "_ms"][0] for phase in PHASES)
+        lines = [f"{1000 / frameMs if frameMs else 0:.0f} fps  {frameMs:.2f} ms"]
+        lines += [f"{phase:<10}{summary[phase + '_ms'][0]:6.2f}{summary[phase + '_ms'][1]:7.2f}" for phase in PHASES]
+        lines += [f"{count:<10}{summary[count][1]:6.0f}" for count in COUNTS]
+        presses = self.inputs and self.inputs.stats()
+        if presses:
+            lines.append(f"{'input':<10}{presses['p50']:6.2f}{presses['p99']:7.2f}")
+
+        rendered = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        # a new surface every time, the dirty rect renderer only notices surfaces that are swapped out
+        self.surf = pygame.Surface((max(line.get_width() for line in rendered) + 10,
+                                    sum(line.get_height() for line in rendered) + 10), pygame.SRCALPHA)
+        self.surf.fill((0, 0, 0, 160))
+        y = 5
+        for line in rendered:
+            self.surf.blit(line, (5, y))
+            y += line.get_height()
+
+    def drawList(self, pos):
+        now = pygame.time.get_ticks()
+        if now - self.lastRefresh >= self.refreshMs:
+            self.lastRefresh = now
+            self.refresh()
+        if self.surf is None:
+            return []
+        return [(self.surf, self.surf.get_rect(topright=pos))]
@@ -0,0 +1,144 @@
+# Runnin' renderers
+# ----------------------------------------------------
+# The game builds a draw list every frame, (surface, rect) pairs from the back layer to the front, and a
+# renderer puts it on the display. SurfaceRenderer redraws the whole screen every frame, DirtyRectRenderer only
+# redraws and uploads the parts of the screen that changed since the last frame. TextureRenderer draws with
+# SDL's GPU renderer instead, at the game's size scaled up to whatever size the window is. present() is
+# render() and then flip(), they're separate so the profiler can time drawing and uploading apart, and
+# capture() between them returns the frame that was just drawn. It's the screen itself where there is one, so
+# it's only good until the next render().
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import weakref
+
+import pygame
+from pygame._sdl2.video import Window, Renderer, Texture
+
+
+class SurfaceRenderer:
+    """Fill the screen, blit everything, flip"""
+
+    def __init__(self, screen):
+        self.screen = screen
+
+    def invalidate(self):
+        pass
+
+    def present(self, background, drawList):
+        self.render(background, drawList)
+        self.flip()
+
+    def render(self, background, drawList):
+        self.screen.fill(background)
+        self.screen.blits(drawList, False)
+
+    def flip(self):
+        pygame.display.flip()
+
+    def capture(self):
+        return self.screen
+
+
+class DirtyRectRenderer:
+    """Only redraw where something appeared, moved, changed or went away, layer order is kept inside those areas"""
+
+    def __init__(self, screen, maxDirty=64):
+        self.screen = screen
+        self.screenRect = screen.get_rect()
+        self.maxDirty = maxDirty  # past this many changed areas just redraw everything
+        self.lastItems = None
+        self.lastDirty = None  # None after a full redraw
+
+    def invalidate(self):
+        """Redraw the whole screen next frame, for when everything changes at once"""
+        self.lastItems = None
+
+    def present(self, background, drawList):
+        self.render(background, drawList)
+        self.flip()
+
+    def render(self, background, drawList):
+        # an item is the same as last frame if it's the same surface in the same place, the previous frame's
+        # surfaces are kept alive in lastItems so their ids can't be reused
+        items = {(id(surf), tuple(rect)): (surf, rect) for surf, rect in drawList}
+        screen = self.screen
+
+        if self.lastItems is None:
+            dirty = None
+        else:
+            changed = items.keys() ^ self.lastItems.keys()
+            dirty = []
+            for key in changed:
+                _, rect = items[key] if key in items else self.lastItems[key]
+                rect = pygame.Rect(rect).clip(self.screenRect)
+                if rect.width and rect.height:
+                    dirty.append(rect)
+            if len(dirty) > self.maxDirty:
+                dirty = None
+        self.lastItems = items
+
+        if dirty is None:
+            screen.fill(background)
+            screen.blits(drawList, False)
+            self.lastDirty = None
+            return
+
+        for area in dirty:
+            screen.set_clip(area)
+            screen.fill(background)
+            screen.blits([(surf, rect) for surf, rect in drawList if area.colliderect(rect)], False)
+        screen.set_clip(None)
+        self.lastDirty = dirty
+
+    def flip(self):
+        if self.lastDirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.lastDirty)
+
+    def capture(self):
+        return self.screen
+
+
+class TextureRenderer:
+    """Draw every surface as a texture, uploaded the first time it's drawn and kept while the surface lives.
+    The frame is drawn at size and scaled to fit the window, letterboxed if the shape doesn't match."""
+
+    def __init__(self, size, title, windowSize=None, fullscreen=False, software=False):
+        self.window = Window(title, size=windowSize or size, resizable=True)
+        if fullscreen:
+            self.window.set_fullscreen(desktop=True)
+        self.renderer = Renderer(self.window, accelerated=0 if software else -1)
+        self.renderer.logical_size = size
+        self.textures = weakref.WeakKeyDictionary()
+
+    def invalidate(self):
+        """Upload every surface again, for when one was drawn on after it became a texture"""
+        self.textures.clear()
+
+    def present(self, background, drawList):
+        self.render(background, drawList)
+        self.flip()
+
+    def render(self, background, drawList):
+        renderer = self.renderer
+        renderer.draw_color = (*background[:3], 255)
+        renderer.clear()
+        textures = self.textures
+        for surf, rect in drawList:
+            texture = textures.get(surf)
+            if texture is None:
+                if not (surf.get_width() and surf.get_height()):
+                    continue  # empty text, SDL won't make a texture of nothing
+                texture = textures[surf] = Texture.from_surface(renderer, surf)
+            # like a blit only the corner of rect counts, the texture is drawn at its own size
+            texture.draw(dstrect=(rect[0], rect[1], texture.width, texture.height))
+
+    def flip(self):
+        self.renderer.present()
+
+    def capture(self):
+        """Only works while the window is the game's own size, SDL can't read back a scaled frame"""
+        return self.renderer.to_surface()
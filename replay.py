@@ -0,0 +1,174 @@
+# Runnin' replays
+# ----------------------------------------------------
+# A run is completely decided by its seed and what the space bar did on each step, so that's all a replay
+# keeps. The file is a small header followed by one entry per change of input:
+#
+#   header   "RNRP", version (u8), seed (u64), steps (u32), final score (u32), flags (u8), little endian
+#   entries  steps since the last entry (varint), action bits (u8)
+#
+# Flag 1 means the run was played with the look-ahead spike patterns from patterns.py. Version 1 replays are
+# the same without the flags byte.
+#
+# Playing one back runs the simulation headless as fast as it goes and checks it ends on the same score.
+#
+#   python replay.py run.rpl
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import argparse
+import struct
+import sys
+import time
+
+from patterns import PatternSpawner
+from simulation import GameState
+
+MAGIC = b"RNRP"
+VERSION = 2
+HEADER = struct.Struct("<4sBQII")
+FLAGS = struct.Struct("<B")
+PATTERNS = 1
+
+
+class ReplayError(Exception):
+    pass
+
+
+class Replay:
+    def __init__(self, seed, changes=None, steps=0, score=0, patterns=False):
+        self.seed = seed
+        self.patterns = patterns
+        self.changes = changes if changes is not None else []  # (step, action) whenever the action changes
+        self.steps = steps
+        self.score = score
+
+    def actions(self):
+        """The action for every step of the run, in order"""
+        action = 0
+        changes = iter(self.changes)
+        nextChange = next(changes, None)
+        for step in range(self.steps):
+            while nextChange is not None and nextChange[0] == step:
+                action = nextChange[1]
+                nextChange = next(changes, None)
+            yield action
+
+    def tobytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, self.steps, self.score))
+        out += FLAGS.pack(PATTERNS if self.patterns else 0)
+        last = 0
+        for step, action in self.changes:
+            delta = step - last
+            last = step
+            while delta >= 0x80:
+                out.append(delta & 0x7F | 0x80)
+                delta >>= 7
+            out.append(delta)
+            out.append(action)
+        return bytes(out)
+
+    @classmethod
+    def frombytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("replay is too short")
+        magic, version, seed, steps, score = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("not a Runnin' replay")
+        if version not in (1, VERSION):
+            raise ReplayError(f"replay version {version} isn't supported")
+        pos = HEADER.size
+        flags = 0
+        if version >= 2:
+            if len(data) < pos + FLAGS.size:
+                raise ReplayError("replay is too short")
+            flags, = FLAGS.unpack_from(data, pos)
+            pos += FLAGS.size
+
+        changes = []
+        step = 0
+        try:
+            while pos < len(data):
+                delta = shift = 0
+                while True:
+                    byte = data[pos]
+                    pos += 1
+                    delta |= (byte & 0x7F) << shift
+                    shift += 7
+                    if not byte & 0x80:
+                        break
+                step += delta
+                changes.append((step, data[pos]))
+                pos += 1
+        except IndexError:
+            raise ReplayError("replay is cut off") from None
+        return cls(seed, changes, steps, score, bool(flags & PATTERNS))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.frombytes(f.read())
+
+
+class Recorder:
+    """Builds a Replay while a run is played, call record() with the action before every step"""
+
+    def __init__(self, seed, patterns=False):
+        self.replay = Replay(seed, patterns=patterns)
+        self.lastAction = 0
+
+    def record(self, step, action):
+        if action != self.lastAction:
+            self.replay.changes.append((step, action))
+            self.lastAction = action
+
+    def finish(self, state):
+        self.replay.steps = state.tick
+        self.replay.score = state.score
+        return self.replay
+
+
+def play(replay, state=None):
+    """Run a replay headless and return the GameState it ends on"""
+    spawner = None
+    if state is None:
+        spawner = PatternSpawner() if replay.patterns else None
+        state = GameState(spawner=spawner)
+    try:
+        state.reset(replay.seed)
+        for action in replay.actions():
+            state.step(action)
+    finally:
+        if spawner:
+            spawner.feed.close()  # its thread would outlive the replay otherwise
+    return state
+
+
+def verify(replay):
+    """Play a replay back, returns whether it still ends on the recorded step and score, and the final state"""
+    state = play(replay)
+    return state.score == replay.score and state.tick == replay.steps, state
+
+
+# ----------------------------------------------------
+# Command line
+# ----------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Runnin' replays back headless and check their scores")
+    parser.add_argument("replays", nargs="+", help="replay files")
+    args = parser.parse_args()
+
+    failed = 0
+    for path in args.replays:
+        replay = Replay.load(path)
+        start = time.perf_counter()
+        ok, state = verify(replay)
+        took = time.perf_counter() - start
+        failed += not ok
+        print(f"{path}: seed {replay.seed}, {replay.steps} steps, recorded score {replay.score}, "
+              f"replayed score {state.score} in {took * 1000:.1f} ms {'ok' if ok else 'MISMATCH'}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,112 @@
+# Runnin' run log
+# ----------------------------------------------------
+# Every finished run is appended to runs.jsonl as one line of JSON, and the best score is kept in
+# highscore.json. The game only ever drops a record into a queue, a background thread does the writing, so a
+# slow disk can't hold up a frame. Replays go through the same queue. If the queue ever fills up records are
+# dropped rather than waited on. close() writes whatever's left before the game exits.
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import json
+import os
+import queue
+import threading
+
+RUNS_FILE = "runs.jsonl"
+HIGHSCORE_FILE = "highscore.json"
+
+
+def readHighscore(folder):
+    try:
+        with open(os.path.join(folder, HIGHSCORE_FILE)) as f:
+            return int(json.load(f)["highscore"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0
+
+
+def writeAtomically(path, text):
+    """Write to a temporary file and swap it in, so there's always either the old or the new file"""
+    temp = path + ".tmp"
+    with open(temp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+class RunLog:
+    """Writes run records and the highscore from a background thread, submit() never blocks"""
+
+    def __init__(self, folder, maxQueue=64):
+        self.folder = folder
+        self.highscore = readHighscore(folder)  # what's on disk, or will be once the queue is written
+        self.queue = queue.Queue(maxQueue)
+        self.dropped = 0
+        self.written = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self.work, name="runlog", daemon=True)
+        self.thread.start()
+
+    def submit(self, record):
+        self.put(("record", record))
+
+    def submitFile(self, path, data):
+        """Write data to path, making its folder if it has to"""
+        self.put(("file", (path, data)))
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def work(self):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+        except OSError:
+            self.errors += 1  # carry on taking records, so the queue never backs up, each write fails on its own
+        runsPath = os.path.join(self.folder, RUNS_FILE)
+        highscore = self.highscore
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            # take everything that's waiting and write it in one go
+            items = [item]
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)  # see it again on the way round
+                    break
+                items.append(item)
+
+            records = [payload for kind, payload in items if kind == "record"]
+            try:
+                for path, data in (payload for kind, payload in items if kind == "file"):
+                    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                    with open(path, "wb") as f:
+                        f.write(data)
+                if records:
+                    with open(runsPath, "a") as f:
+                        f.writelines(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+                    best = max(record["score"] for record in records)
+                    if best > highscore:
+                        writeAtomically(os.path.join(self.folder, HIGHSCORE_FILE), json.dumps({"highscore": best}))
+                        highscore = best
+                self.written += len(items)
+            except OSError:
+                self.errors += 1  # a run log isn't worth crashing the game over
+
+    def close(self, timeout=2):
+        """Write everything still queued and stop the thread, gives up after timeout seconds"""
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
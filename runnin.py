@@ -5,26 +5,51 @@
 
 # Github page can be found here https://github.com/Maxson52/runnin-pygame
 
+# The game logic lives in simulation.py, this file opens the window, reads the keyboard, plays the sounds and
+# draws whatever the simulation says is going on
+
 # ----------------------------------------------------
 # Imports
 # ----------------------------------------------------
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # stdout can be the frames with --capture -
+
 import pygame
 import random
-import os
 import sys
+import time
+import argparse
 from pygame import mixer
 from pygame.locals import (
     KEYDOWN,
     K_ESCAPE,
+    K_F3,
     K_SPACE,
     K_LEFT,
     K_RIGHT
 )
 
-pygame.init()
-
-WIDTH = 853
-HEIGHT = 480
+import atlas
+import audio
+from assetcache import assetCache
+from capture import FrameCapture
+from inputs import InputLayer, clockMs
+from patterns import PatternSpawner
+from particles import BackgroundSquares
+from profiler import Profiler, ProfilerHud
+from renderers import SurfaceRenderer, DirtyRectRenderer, TextureRenderer
+from replay import Recorder
+from runlog import RunLog
+from textcache import textCache, DigitAtlas
+from simulation import (
+    WIDTH,
+    HEIGHT,
+    TICKRATE,
+    TICK_MS,
+    SPACE_HELD,
+    POWERUPKINDS,
+    GameState
+)
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -35,112 +60,50 @@ PINK = (255, 105, 180)
 GREY = (128, 128, 128)
 
 ALLCOLORS = [WHITE, RED, GREEN, 'yellow', PINK, 'orange']
-playerColor = 0
 
 currColor = (55, 65, 252)
 secondaryColor = (48, 51, 217)
 spikeColor = (38, 41, 207)
 
-SCORE = 0
-HIGHSCORE = 0
-
-SPEEDMULTIPLIER = 0.005
-SPIKESPEED = 6
-
-EXTRALIFE = False
-NOSPIKES = False
-MORESPIKES = ""
-POWERUP_TEXT = ""
+MAXFRAME_MS = 250  # a frame slower than this slows the game down instead of fast forwarding through it
 
 # Set up file directory stuff
-APP_FOLDER = os.path.dirname(os.path.realpath(sys.argv[0]))
+APP_FOLDER = os.path.dirname(os.path.realpath(__file__))
 FONT_DIR = os.path.join(APP_FOLDER, "assets/Montserrat-Regular.ttf")
 ICON_DIR = os.path.join(APP_FOLDER, "assets/logo.png")
 JUMP_DIR = os.path.join(APP_FOLDER, "assets/jump.mp3")
 DEATH_DIR = os.path.join(APP_FOLDER, "assets/death.mp3")
 MUSIC_DIR = os.path.join(APP_FOLDER, "assets/music.mp3")
-P_HEART_DIR = os.path.join(APP_FOLDER, "assets/heart.png")
-P_INVINCIBLE_DIR = os.path.join(APP_FOLDER, "assets/invincible.png")
-P_MORESPIKES_DIR = os.path.join(APP_FOLDER, "assets/moreSpikes.png")
-P_SPEEDBOOST_DIR = os.path.join(APP_FOLDER, "assets/speedBoost.png")
-
-# Init things and stuffs
-screen = pygame.display.set_mode([WIDTH, HEIGHT])
-pygame.display.set_caption('Runnin\'')
-icon = pygame.image.load(ICON_DIR)
-pygame.display.set_icon(icon)
-
-
-# Set up mixer and sounds
-mixer.init()
-
-music = pygame.mixer.music.load(MUSIC_DIR)
-pygame.mixer.music.play(-1)  # -1 will loop the song
-pygame.mixer.music.set_volume(0.01)
-
-
-jump = pygame.mixer.Sound(JUMP_DIR)
-# it's not actually dying, just taking a quick breather, dying is too violent
-die = pygame.mixer.Sound(DEATH_DIR)
-jump.set_volume(0.1)
-die.set_volume(0.3)
+SAVE_DIR = os.path.join(APP_FOLDER, "save")
+ICON_SIZE = (64, 64)
 
 # ----------------------------------------------------
 # Classes
 # ----------------------------------------------------
-colliding = False
-gravityChanging = False
+
+
+def lerp(a, b, alpha):
+    return a + (b - a) * alpha
 
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self):
+    def __init__(self, color):
         super(Player, self).__init__()
         self.surf = pygame.Surface((50, 50))
-        self.surf.fill(ALLCOLORS[playerColor])
+        self.surf.fill(color)
         self.rect = self.surf.get_rect(topleft=(50, HEIGHT / 2))
-        self.mask = pygame.mask.from_surface(self.surf)
-
-        # print(self.mask.count())
-
-        self.yvel = 0
-        self.gravityDown = True
-
-    def update(self, pressed):
-        if self.yvel > 15:
-            self.yvel = 15
-        if self.yvel < -15:
-            self.yvel = -15
-
-        if not colliding:
-            if self.gravityDown:
-                self.yvel += 1
-            else:
-                self.yvel -= 1
-
-            self.rect.move_ip(0, self.yvel)
-        if pressed[K_SPACE] and colliding:
-            if self.gravityDown:
-                self.yvel -= 15
-            else:
-                self.yvel += 15
 
-            self.rect.move_ip(0, self.yvel)
-        elif colliding:
-            self.yvel = 0
+    def update(self, player, alpha):
+        self.rect = player.rect.copy()
+        self.rect.y = lerp(player.lastY, player.rect.y, alpha)
 
-    def gravitySwitch(self):
-        global gravityChanging
-        gravityChanging = True
-        self.gravityDown = not self.gravityDown
-
-    def changeColor(self):
-        self.surf.fill(ALLCOLORS[playerColor])
+    def changeColor(self, color):
+        self.surf.fill(color)
 
 
 class Platform(pygame.sprite.Sprite):
     def __init__(self, position):
         super(Platform, self).__init__()
-        global currColor
 
         self.w = 1000
         self.h = 50
@@ -150,119 +113,40 @@ class Platform(pygame.sprite.Sprite):
         self.rect = self.surf.get_rect(topleft=(0, position))
 
 
-class BottomSpike(pygame.sprite.Sprite):
-    def __init__(self):
-        super(BottomSpike, self).__init__()
-
-        self.size = (50, 50)
-        self.surf = pygame.Surface(self.size)
-        self.rect = self.surf.get_rect(topleft=(300, 300))
-        self.surf.fill(WHITE)  # this is only for the mask to work
-        self.mask = pygame.mask.from_surface(self.surf)
-
-        self.x = WIDTH
-        self.squish = 90
-
-    def update(self):
-        self.x -= SPIKESPEED
-        self.pos = [[self.x, HEIGHT - 50], [self.x + 50,
-                                            HEIGHT - 50], [self.x + 25, HEIGHT - self.squish]]
-
-        # draw triangle to screen
-        pygame.draw.polygon(screen, spikeColor, self.pos)
-
-        self.rect.x = self.x  # update collision box position
-        self.rect.y = HEIGHT - self.squish
-
-        if self.rect.right <= 0:
-            self.kill()
-
-        for spike in allSpikes:
-            if self.rect.top == spike.rect.top:
-                if self.rect.left < spike.rect.right and self.rect.left > spike.rect.left:
-                    self.kill()
-
-
-class TopSpike(pygame.sprite.Sprite):
-    def __init__(self):
-        super(TopSpike, self).__init__()
-
-        self.size = (50, 50)
-        self.surf = pygame.Surface(self.size)
-        self.rect = self.surf.get_rect(topleft=(300, 300))
-        self.surf.fill(WHITE)  # this is only for the mask to work
-        self.mask = pygame.mask.from_surface(self.surf)
-
-        self.x = WIDTH
-        self.squish = 90
-
-    def update(self):
-        self.x -= SPIKESPEED
-        self.pos = [[self.x, 50], [self.x + 50, 50],
-                    [self.x + 25, self.squish]]
-
-        # draw triangle to screen
-        pygame.draw.polygon(screen, spikeColor, self.pos)
-
-        self.rect.x = self.x  # update collision box position
-        self.rect.y = 50
-
-        if self.rect.right <= 0:
-            self.kill()
-
-        for spike in allSpikes:
-            if self.rect.top == spike.rect.top:
-                if self.rect.left < spike.rect.right and self.rect.left > spike.rect.left:
-                    self.kill()
-
-
-class BackgroundSquare(pygame.sprite.Sprite):
-    def __init__(self):
-        super(BackgroundSquare, self).__init__()
-        global currColor
-
-        self.size = random.randint(40, 60)
-        self.alpha = random.randint(1, 25)
-        self.speed = random.randint(1, 3)
-        self.startH = random.randint(50, HEIGHT - 50)
-
-        self.surf = pygame.Surface((self.size, self.size))
-        self.surf.set_alpha(self.alpha)
-        self.surf.fill(WHITE)
-        self.rect = self.surf.get_rect(topleft=(WIDTH, self.startH))
-
-    def update(self):
-        self.speed += SPEEDMULTIPLIER
-
-        if self.rect.right <= 0:
-            self.kill()
-        self.rect.move_ip(-self.speed, 0)
-
-
 class ScoreText(pygame.sprite.Sprite):
     def __init__(self):
         super(ScoreText, self).__init__()
-        self.font = pygame.font.Font(
-            FONT_DIR, 32)
-        self.surf = self.font.render(f"{SCORE}", True, WHITE)
-        self.rect = self.surf.get_rect(center=(WIDTH / 2, 23))
+        self.digits = DigitAtlas(FONT_DIR, 32, WHITE)
+        # wide enough for a 10 digit score, which nobody is getting
+        self.canvas = pygame.Surface(
+            (max(self.digits.width(d) for d in range(10)) * 10, self.digits.height), pygame.SRCALPHA)
+        self.rect = self.digits.digits[0].get_rect(center=(WIDTH / 2, 23))
+        self.score = None
+        self.update(0)
+
+    def update(self, score):
+        if score == self.score:
+            return
+        self.score = score
 
-    def update(self):
-        global SCORE
-        SCORE += 1
-        self.surf = self.font.render(f"{SCORE}", True, WHITE)
+        self.canvas.fill((0, 0, 0, 0))
+        width = self.digits.draw(self.canvas, score, (0, 0))
+        self.surf = self.canvas.subsurface((0, 0, width, self.digits.height))
+        self.rect = self.surf.get_rect(topleft=self.rect.topleft)
 
 
 class PowerupText(pygame.sprite.Sprite):
     def __init__(self):
         super(PowerupText, self).__init__()
-        self.font = pygame.font.Font(
-            FONT_DIR, 32)
-        self.surf = self.font.render(POWERUP_TEXT, True, WHITE)
-        self.rect = self.surf.get_rect(center=(WIDTH / 2, HEIGHT - 22))
+        self.text = None
+        self.update("")
 
-    def update(self):
-        self.surf = self.font.render(POWERUP_TEXT, True, WHITE)
+    def update(self, text):
+        if text == self.text:
+            return
+        self.text = text
+
+        self.surf = textCache.render(FONT_DIR, 32, text, WHITE)
         self.rect = self.surf.get_rect(center=(WIDTH / 2, HEIGHT - 22))
 
 # Main screen classes
@@ -271,13 +155,12 @@ class PowerupText(pygame.sprite.Sprite):
 class TitleScreenText(pygame.sprite.Sprite):
     def __init__(self, size):
         super(TitleScreenText, self).__init__()
-        self.font = pygame.font.Font(
-            FONT_DIR, size)
-        self.surf = self.font.render("", True, WHITE)
+        self.size = size
+        self.surf = textCache.render(FONT_DIR, self.size, "", WHITE)
         self.rect = self.surf.get_rect(center=(WIDTH / 2, HEIGHT / 2))
 
     def update(self, text, posY, posX, centered):
-        self.surf = self.font.render(text, True, WHITE)
+        self.surf = textCache.render(FONT_DIR, self.size, text, WHITE)
 
         if centered:
             self.rect = self.surf.get_rect(
@@ -295,6 +178,30 @@ class TitleScreenBackground(pygame.sprite.Sprite):
         self.rect = self.surf.get_rect()
 
 
+class TitleScreenLayer(pygame.sprite.Sprite):
+    """Everything on the title screen that doesn't move, drawn into one surface that's only drawn again when
+    something on it changes"""
+
+    def __init__(self):
+        super(TitleScreenLayer, self).__init__()
+        self.surf = None
+        self.rect = None
+        self.key = None
+
+    def redraw(self, key, drawList):
+        """Flatten drawList into a new layer, key is whatever it was drawn from"""
+        # a new surface every time, the other renderers only notice surfaces that are swapped out
+        surf = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        surf.blits(drawList, False)
+        # cropped to what's on it, and as it's mostly see-through even then, run length encoded so the
+        # empty parts are skipped over when it's blitted
+        bounds = surf.get_bounding_rect()
+        self.surf = surf.subsurface(bounds).copy()
+        self.surf.set_alpha(255, pygame.RLEACCEL)
+        self.rect = bounds
+        self.key = key
+
+
 class CharacterSelectBox(pygame.sprite.Sprite):
     def __init__(self, color, pos):
         super(CharacterSelectBox, self).__init__()
@@ -325,379 +232,476 @@ class CharacterSelectBox(pygame.sprite.Sprite):
 
         self.rect = self.surf.get_rect(center=(self.pos + self.center, self.y))
 
-# Powerup classes
-
-
-class P_Heart(pygame.sprite.Sprite):
-    def __init__(self):
-        super(P_Heart, self).__init__()
-        self.surf = pygame.image.load(P_HEART_DIR).convert_alpha()
-        self.surf = pygame.transform.scale(self.surf, (25, 25))
-        self.rect = self.surf.get_rect(
-            topleft=(WIDTH, HEIGHT / 2))
-
-    def update(self, pos):
-        if pos != None:
-            self.rect.x = WIDTH + pos
-
-        self.rect.move_ip(-SPIKESPEED, 0)
-
-        heartTouch = pygame.sprite.collide_rect(p1, self)
-        if heartTouch:
-            global EXTRALIFE
-            global POWERUP_TEXT
-            POWERUP_TEXT = "+1 Life"
-            EXTRALIFE = True
-            self.rect.right = 0
-
-
-class P_Invincible(pygame.sprite.Sprite):
-    def __init__(self):
-        super(P_Invincible, self).__init__()
-        self.surf = pygame.image.load(P_INVINCIBLE_DIR).convert_alpha()
-        self.surf = pygame.transform.scale(self.surf, (25, 25))
-        self.rect = self.surf.get_rect(topleft=(WIDTH, HEIGHT / 2))
-
-        self.startScore = 0
+# Spikes are always the same triangle, so each kind is drawn once and blitted from then on
+spikeSprites = {}
 
-    def update(self, pos):
-        global NOSPIKES
-        global POWERUP_TEXT
 
-        if SCORE >= self.startScore + 100 and NOSPIKES != False:
-            NOSPIKES = False
-            POWERUP_TEXT = ""
-
-        if pos != None:
-            self.rect.x = WIDTH + pos
-
-        self.rect.move_ip(-SPIKESPEED, 0)
-
-        invincibleTouch = pygame.sprite.collide_rect(p1, self)
-        if invincibleTouch:
-            POWERUP_TEXT = "No Spikes!"
-            NOSPIKES = True
-            self.rect.right = 0
-            self.startScore = SCORE
-
-
-class P_MoreSpikes(pygame.sprite.Sprite):
-    def __init__(self):
-        super(P_MoreSpikes, self).__init__()
-        self.surf = pygame.image.load(P_MORESPIKES_DIR).convert_alpha()
-        self.surf = pygame.transform.scale(self.surf, (25, 25))
-        self.rect = self.surf.get_rect(topleft=(WIDTH, HEIGHT / 2))
-
-        self.startScore = 0
-
-    def update(self, pos):
-        global MORESPIKES
-        global POWERUP_TEXT
-
-        if SCORE >= self.startScore + 250 and MORESPIKES != "":
-            MORESPIKES = ""
-            POWERUP_TEXT = ""
-
-        if pos != None:
-            self.rect.x = WIDTH + pos
-
-        self.rect.move_ip(-SPIKESPEED, 0)
-
-        invincibleTouch = pygame.sprite.collide_rect(p1, self)
-        if invincibleTouch:
-            POWERUP_TEXT = "More Spikes!"
-            self.rect.right = 0
-            self.startScore = SCORE
+def spikeSprite(lane, squish, color):
+    key = (lane, squish, color)
+    if key not in spikeSprites:
+        h = squish - 50
+        surf = pygame.Surface((51, h + 1), pygame.SRCALPHA)
+        if lane == "bot":
+            pos = [[0, h], [50, h], [25, 0]]
+        else:
+            pos = [[0, 0], [50, 0], [25, h]]
+        pygame.draw.polygon(surf, color, pos)
+        spikeSprites[key] = surf
+    return spikeSprites[key]
 
-            if p1.gravityDown:
-                MORESPIKES = "bot"
-            else:
-                MORESPIKES = "top"
+# Powerup classes, where they are and what they do is up to the simulation
 
 
-class P_SpeedBoost(pygame.sprite.Sprite):
-    def __init__(self):
-        super(P_SpeedBoost, self).__init__()
-        self.surf = pygame.image.load(P_SPEEDBOOST_DIR).convert_alpha()
-        self.surf = pygame.transform.scale(self.surf, (25, 25))
-        self.rect = self.surf.get_rect(topleft=(WIDTH, HEIGHT / 2))
-        self.speed = SPIKESPEED
+def powerupImage(kind):
+    """The image a PowerupKind is drawn with, the game's logo for a kind without its own icon"""
+    return os.path.join(APP_FOLDER, "assets", kind.icon) if kind.icon else ICON_DIR
 
-    def update(self, pos):
-        if pos != None:
-            self.rect.x = WIDTH + pos
 
-        global SPIKESPEED
-        self.rect.move_ip(-SPIKESPEED, 0)
+class PowerupIcon(pygame.sprite.Sprite):
+    def __init__(self, imageDir):
+        super(PowerupIcon, self).__init__()
+        self.imageDir = imageDir
+        self.rect = pygame.Rect(WIDTH, HEIGHT / 2, 25, 25)
 
-        invincibleTouch = pygame.sprite.collide_rect(p1, self)
-        if invincibleTouch:
-            global POWERUP_TEXT
-            POWERUP_TEXT = "+2 Speed Increase"
-            SPIKESPEED += 2
-            self.rect.right = 0
+    @property
+    def surf(self):
+        # loaded the first time it's drawn, the title screen doesn't need it
+        return assetCache.image(self.imageDir, (25, 25))
 
+    def update(self, powerup, alpha):
+        self.rect = powerup.rect.copy()
+        self.rect.x = lerp(powerup.lastX, powerup.rect.x, alpha)
 
-# ----------------------------------------------------
-# Init class sprites
-# ----------------------------------------------------
-p1 = Player()
-scoreText = ScoreText()
-platforms = pygame.sprite.Group()
-bgSquares = pygame.sprite.Group()
-allSpikes = pygame.sprite.Group()
-all_sprites = pygame.sprite.Group()
-all_sprites.add(p1)
-
-ts_Highscore = TitleScreenText(18)
-ts_YourScore = TitleScreenText(18)
-ts_PressSpace = TitleScreenText(32)
-ts_CharSelect = TitleScreenText(24)
-ts_CharSelectTips = TitleScreenText(14)
-ts_HowToPlay1 = TitleScreenText(14)
-ts_HowToPlay2 = TitleScreenText(14)
-ts_HowToPlay3 = TitleScreenText(14)
-ts_HowToPlay4 = TitleScreenText(14)
-ts_HowToPlayButton = TitleScreenText(32)
-titleScreenBackground = TitleScreenBackground()
-titleScreen = pygame.sprite.Group()
-titleScreen.add(titleScreenBackground)
-titleScreen.add(ts_Highscore)
-titleScreen.add(ts_YourScore)
-titleScreen.add(ts_PressSpace)
-titleScreen.add(ts_CharSelect)
-titleScreen.add(ts_CharSelectTips)
-titleScreen.add(ts_HowToPlayButton)
-
-characterSelectBoxes = pygame.sprite.Group()
-for i in range(len(ALLCOLORS)):
-    new_char = CharacterSelectBox(ALLCOLORS[i], i * 50)
-    characterSelectBoxes.add(new_char)
-
-top = Platform(0)
-bottom = Platform(HEIGHT - 50)
-platforms.add(top)
-platforms.add(bottom)
-all_sprites.add(top)
-all_sprites.add(bottom)
-# Order is important to keep everything on the correct layer
-all_sprites.add(scoreText)
-
-MAKEBG = pygame.USEREVENT + 1
-pygame.time.set_timer(MAKEBG, 150)
-
-MAKEBOTTOMSPIKE = pygame.USEREVENT + 2
-pygame.time.set_timer(MAKEBOTTOMSPIKE, random.randint(500, 750))
-MAKETOPSPIKE = pygame.USEREVENT + 3
-pygame.time.set_timer(MAKETOPSPIKE, random.randint(500, 750))
-
-# Init powerup classes
-heart = P_Heart()
-invincible = P_Invincible()
-moreSpikes = P_MoreSpikes()
-speedBoost = P_SpeedBoost()
-powerupText = PowerupText()
-powerupGroup = pygame.sprite.Group()
-powerupGroup.add(heart)
-powerupGroup.add(invincible)
-powerupGroup.add(moreSpikes)
-powerupGroup.add(speedBoost)
-powerupGroup.add(powerupText)
 
 # ----------------------------------------------------
-# Game loop
+# Game
 # ----------------------------------------------------
-clock = pygame.time.Clock()
-
-jumpTimer = pygame.time.Clock()
-
-gameOverTimer = pygame.time.get_ticks()
-
-running = True
-gameOver = True
-
-while running:
-    for e in pygame.event.get():
-        if e.type == pygame.QUIT:  # on quit
-            running = False
-        if e.type == KEYDOWN:  # on key down
-            if e.key == K_ESCAPE:
-                running = False
-            if e.key == K_SPACE and not gravityChanging:
-                jump.play()
-                if jumpTimer.tick() < 400:
-                    p1.gravitySwitch()
-            if e.key == K_LEFT and gameOver:  # handle character customization
-                if not playerColor == 0:
-                    playerColor -= 1
-                    p1.changeColor()
-            if e.key == K_RIGHT and gameOver:
-                if not playerColor == len(ALLCOLORS) - 1:
-                    playerColor += 1
-                    p1.changeColor()
-        if e.type == MAKEBG:  # user events
-            new_square = BackgroundSquare()
-            bgSquares.add(new_square)
-        if e.type == MAKEBOTTOMSPIKE:
-            if MORESPIKES == "bot":
-                randomNumber = 10
+class Game:
+    def __init__(self, fps=60, dirtyRects=False, recordDir=None, profilePath=None, startupReport=False,
+                 audioBuffer=audio.BUFFER, saveDir=None, textures=False, windowSize=None, fullscreen=False,
+                 patterns=False, capture=None):
+        self.startupStart = time.perf_counter()
+        self.startupTimes = []  # (what, ms since the last one), up to the first frame
+        self.startupReport = startupReport
+        audio.preInit(audioBuffer)
+        pygame.init()
+
+        # Init things and stuffs
+        # prescaled sprites come from the texture atlas if one's been built
+        assetCache.useAtlas(atlas.load())
+        icon = assetCache.atlas and assetCache.atlas.get("logo.png", ICON_SIZE)
+        icon = icon or pygame.image.load(ICON_DIR)
+        if textures:
+            # surfaces still need a display to be converted for, it just never gets shown
+            self.screen = pygame.display.set_mode([1, 1], pygame.HIDDEN)
+            self.renderer = TextureRenderer((WIDTH, HEIGHT), 'Runnin\'', windowSize, fullscreen)
+            self.renderer.window.set_icon(icon)
+        else:
+            self.screen = pygame.display.set_mode([WIDTH, HEIGHT])
+            if dirtyRects:
+                self.renderer = DirtyRectRenderer(self.screen)
             else:
-                if SPIKESPEED > 16:  # if speed is high, make more spikes
-                    randomNumber = random.randint(100, 400)
-                elif SPIKESPEED > 12:
-                    randomNumber = random.randint(300, 650)
-                else:
-                    randomNumber = random.randint(500, 1000)
-
-            pygame.time.set_timer(MAKEBOTTOMSPIKE, randomNumber)
-            new_spike = BottomSpike()
-            allSpikes.add(new_spike)
-        if e.type == MAKETOPSPIKE:
-            if MORESPIKES == "top":
-                randomNumber = 10
+                self.renderer = SurfaceRenderer(self.screen)
+            pygame.display.set_caption('Runnin\'')
+            pygame.display.set_icon(icon)
+        self.startupMark("window")
+
+        # Set up mixer and sounds
+        mixer.init()
+        # it's not actually dying, just taking a quick breather, dying is too violent
+        self.audio = audio.Audio({"jump": (JUMP_DIR, 0.1), "die": (DEATH_DIR, 0.3)})
+        self.audio.playMusic(MUSIC_DIR, 0.01)
+
+        # everything the title screen doesn't show is decoded in the background while it's up
+        assetCache.preload(images=[powerupImage(kind) for kind in POWERUPKINDS],
+                           sounds=[JUMP_DIR, DEATH_DIR], loadSound=audio.loadSfx)
+        self.startupMark("audio")
+
+        # spikes come from the look-ahead pattern thread instead of the spawn rules with --patterns
+        self.patterns = patterns
+        self.spawner = PatternSpawner() if patterns else None
+        self.state = GameState(spawner=self.spawner)
+        self.playerColor = 0
+        # finished runs and the highscore are saved to saveDir on another thread
+        self.runLog = RunLog(saveDir) if saveDir else None
+        self.highscore = self.runLog.highscore if self.runLog else 0
+
+        # Init class sprites
+        self.p1 = Player(ALLCOLORS[self.playerColor])
+        self.scoreText = ScoreText()
+        self.platforms = pygame.sprite.Group()
+        self.bgSquares = BackgroundSquares()
+        self.all_sprites = pygame.sprite.Group()
+        self.all_sprites.add(self.p1)
+
+        self.ts_Highscore = TitleScreenText(18)
+        self.ts_YourScore = TitleScreenText(18)
+        self.ts_PressSpace = TitleScreenText(32)
+        self.ts_CharSelect = TitleScreenText(24)
+        self.ts_CharSelectTips = TitleScreenText(14)
+        self.ts_HowToPlay1 = TitleScreenText(14)
+        self.ts_HowToPlay2 = TitleScreenText(14)
+        self.ts_HowToPlay3 = TitleScreenText(14)
+        self.ts_HowToPlay4 = TitleScreenText(14)
+        self.ts_HowToPlayButton = TitleScreenText(32)
+        self.ts_HowToPlayButton.update("?", 5, 10, False)
+        self.titleScreenBackground = TitleScreenBackground()
+        self.titleScreenLayer = TitleScreenLayer()
+        self.titleScreen = pygame.sprite.Group()
+        self.titleScreen.add(self.ts_Highscore)
+        self.titleScreen.add(self.ts_YourScore)
+        self.titleScreen.add(self.ts_PressSpace)
+        self.titleScreen.add(self.ts_CharSelect)
+        self.titleScreen.add(self.ts_CharSelectTips)
+        self.titleScreen.add(self.ts_HowToPlayButton)
+
+        self.characterSelectBoxes = pygame.sprite.Group()
+        for i in range(len(ALLCOLORS)):
+            new_char = CharacterSelectBox(ALLCOLORS[i], i * 50)
+            self.characterSelectBoxes.add(new_char)
+
+        top = Platform(0)
+        bottom = Platform(HEIGHT - 50)
+        self.platforms.add(top)
+        self.platforms.add(bottom)
+        self.all_sprites.add(top)
+        self.all_sprites.add(bottom)
+        # Order is important to keep everything on the correct layer
+        self.all_sprites.add(self.scoreText)
+
+        # Init powerup classes, one icon for each kind of powerup in the simulation
+        self.powerupIcons = {kind.name: PowerupIcon(powerupImage(kind)) for kind in POWERUPKINDS}
+        self.powerupText = PowerupText()
+
+        self.inputs = InputLayer()
+        self.fps = fps
+        self.recordDir = recordDir
+        self.recorder = None
+        # the profiler only exists once it's asked for, with --profile or the F3 overlay
+        self.profilePath = profilePath
+        self.profiler = Profiler() if profilePath else None
+        self.profilerHud = None
+        # a FrameCapture gets every frame once it's drawn, with --capture
+        self.capture = capture
+        self.drawn = 0
+        self.gameOverTimer = pygame.time.get_ticks()
+
+        self.running = True
+        self.gameOver = True
+        self.startupMark("sprites")
+
+    def startupMark(self, what):
+        now = time.perf_counter()
+        self.startupTimes.append((what, (now - self.startupStart) * 1000))
+        self.startupStart = now
+
+    def printStartup(self):
+        for what, ms in self.startupTimes:
+            print(f"{what:<24}{ms:8.2f} ms", file=sys.stderr)
+        print(f"{'time to first frame':<24}{sum(ms for _, ms in self.startupTimes):8.2f} ms", file=sys.stderr)
+
+    def spaceHeld(self):
+        return self.inputs.held
+
+    def handleEvents(self):
+        """Deal with the event queue, the space bar goes to the simulation through self.inputs"""
+        self.inputs.poll()
+        for e in self.inputs.take():
+            if e.type in (pygame.QUIT, pygame.WINDOWCLOSE):  # on quit
+                self.running = False
+            if e.type == KEYDOWN:  # on key down
+                if e.key == K_ESCAPE:
+                    self.running = False
+                if e.key == K_F3:
+                    self.toggleProfilerHud()
+                if e.key == K_SPACE and self.gameOver:
+                    self.audio.play("jump")
+                if e.key == K_LEFT and self.gameOver:  # handle character customization
+                    if not self.playerColor == 0:
+                        self.playerColor -= 1
+                        self.p1.changeColor(ALLCOLORS[self.playerColor])
+                        self.renderer.invalidate()
+                if e.key == K_RIGHT and self.gameOver:
+                    if not self.playerColor == len(ALLCOLORS) - 1:
+                        self.playerColor += 1
+                        self.p1.changeColor(ALLCOLORS[self.playerColor])
+                        self.renderer.invalidate()
+
+    def toggleProfilerHud(self):
+        if self.profilerHud:
+            self.profilerHud = None
+            return
+        if not self.profiler:
+            self.profiler = Profiler()
+        self.profilerHud = ProfilerHud(self.profiler, pygame.font.SysFont("monospace", 14), inputs=self.inputs)
+
+    def startRun(self, seed):
+        # reset game, everything random in a run comes from its seed so it can be replayed
+        self.state.reset(seed)
+        self.bgSquares.random.seed(seed)
+        if self.recordDir:
+            self.recorder = Recorder(seed, self.patterns)
+        self.gameOver = False
+
+    def endRun(self):
+        self.gameOver = True
+        self.gameOverTimer = pygame.time.get_ticks()
+        if self.recorder:
+            replay = self.recorder.finish(self.state)
+            path = os.path.join(self.recordDir, time.strftime(f"%Y%m%d-%H%M%S-{replay.score}.rpl"))
+            if self.runLog:
+                self.runLog.submitFile(path, replay.tobytes())
             else:
-                if SPIKESPEED > 16:  # if speed is high, make more spikes
-                    randomNumber = random.randint(100, 400)
-                elif SPIKESPEED > 12:
-                    randomNumber = random.randint(300, 650)
-                else:
-                    randomNumber = random.randint(500, 1000)
-
-            pygame.time.set_timer(MAKETOPSPIKE, randomNumber)
-            new_spike = TopSpike()
-            allSpikes.add(new_spike)
-
-    screen.fill(currColor)
-
-    if gameOver:
+                os.makedirs(self.recordDir, exist_ok=True)
+                replay.save(path)
+            self.recorder = None
+        if self.runLog:
+            self.runLog.submit({
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "seed": self.state.seed,
+                "score": self.state.score,
+                "topSpeed": round(self.state.spikeSpeed, 3),  # it only ever goes up
+                "powerups": self.state.collected,
+                "killedBy": {"bot": "bottom spike", "top": "top spike"}[self.state.killedBy],
+                "color": self.playerColor,
+            })
+
+    def updateTitleScreen(self):
         # this is where the start screen and stuff would go
-        if SCORE > HIGHSCORE:
-            HIGHSCORE = SCORE
-
-        pressed = pygame.key.get_pressed()
-        if pressed[K_SPACE]:
-            if pygame.time.get_ticks() - gameOverTimer > 500:
-                # reset powerups and their position
-                heartPos = random.randint(200, 30000)
-                invinciblePos = random.randint(200, 30000)
-                moreSpikesPos = random.randint(200, 30000)
-                speedBoostPos = random.randint(200, 30000)
-                heart.update(heartPos)
-                invincible.update(invinciblePos)
-                moreSpikes.update(moreSpikesPos)
-                speedBoost.update(speedBoostPos)
-                POWERUP_TEXT = ""
-                NOSPIKES = False
-                MORESPIKES = ""
-
-                # reset game
-                allSpikes.empty()
-                pygame.time.set_timer(MAKETOPSPIKE, random.randint(600, 1000))
-                pygame.time.set_timer(
-                    MAKEBOTTOMSPIKE, random.randint(600, 1000))
-                SPIKESPEED = 6
-                SCORE = 0
-                gameOver = False
-
-        bgSquares.update()
-        ts_Highscore.update(f"Highscore {HIGHSCORE}", -200, 0, True)
-        ts_YourScore.update(f"Your score {SCORE}", -170, 0, True)
-        ts_PressSpace.update("Press space to play", -25, 0, True)
-        ts_CharSelect.update("Character selection", 100, 0, True)
-        ts_CharSelectTips.update(
+        if self.state.score > self.highscore:
+            self.highscore = self.state.score
+
+        if self.spaceHeld():
+            if pygame.time.get_ticks() - self.gameOverTimer > 500:
+                self.startRun(random.randrange(2 ** 63))
+
+        if self.profiler:
+            self.profiler.mark("sim")
+        self.bgSquares.update()
+        if self.profiler:
+            self.profiler.mark("particles")
+        for character in self.characterSelectBoxes:
+            if character.color == ALLCOLORS[self.playerColor]:
+                character.update(True)
+            else:
+                character.update(False)
+        if self.profiler:
+            self.profiler.mark("sim")
+
+    def drawTitleScreen(self, alpha):
+        # only the selected character bounces, everything else stays put until one of these changes
+        howToPlay = self.ts_HowToPlayButton.surf.get_rect().collidepoint(pygame.mouse.get_pos())
+        key = (self.highscore, self.state.score, self.playerColor, howToPlay)
+        if key != self.titleScreenLayer.key:
+            self.titleScreenLayer.redraw(key, self.titleScreenDrawList(howToPlay))
+
+        drawList = self.bgSquares.drawList(alpha)
+        drawList.append((self.titleScreenBackground.surf, self.titleScreenBackground.rect))
+        drawList.append((self.titleScreenLayer.surf, self.titleScreenLayer.rect))
+        drawList += [(character.surf, character.rect) for character in self.characterSelectBoxes
+                     if character.color == ALLCOLORS[self.playerColor]]
+        return drawList
+
+    def titleScreenDrawList(self, howToPlay):
+        """The title screen text and the characters that aren't selected"""
+        self.ts_Highscore.update(f"Highscore {self.highscore}", -200, 0, True)
+        self.ts_YourScore.update(f"Your score {self.state.score}", -170, 0, True)
+        self.ts_PressSpace.update("Press space to play", -25, 0, True)
+        self.ts_CharSelect.update("Character selection", 100, 0, True)
+        self.ts_CharSelectTips.update(
             "Use your arrow keys to navigate", 127, 0, True)
 
-        ts_HowToPlayButton.update("?", 5, 10, False)
-
-        ts_HowToPlay1.update("Press space to jump", 40, 10, False)
-        ts_HowToPlay2.update(
+        self.ts_HowToPlay1.update("Press space to jump", 40, 10, False)
+        self.ts_HowToPlay2.update(
             "Double press space to change gravity", 60, 10, False)
-        ts_HowToPlay3.update(
+        self.ts_HowToPlay3.update(
             "Collect power-ups, and avoid power-downs", 80, 10, False)
-        ts_HowToPlay4.update("Beat your highscore!", 100, 10, False)
-
-        for square in bgSquares:
-            screen.blit(square.surf, square.rect)
-
-        for graphic in titleScreen:
-            screen.blit(graphic.surf, graphic.rect)
-
-        for character in characterSelectBoxes:
-            if character.color == ALLCOLORS[playerColor]:
-                character.update(True)
-            else:
-                character.update(False)
-            screen.blit(character.surf, character.rect)
-
-        if ts_HowToPlayButton.surf.get_rect().collidepoint(pygame.mouse.get_pos()):
-            screen.blit(ts_HowToPlay1.surf, ts_HowToPlay1.rect)
-            screen.blit(ts_HowToPlay2.surf, ts_HowToPlay2.rect)
-            screen.blit(ts_HowToPlay3.surf, ts_HowToPlay3.rect)
-            screen.blit(ts_HowToPlay4.surf, ts_HowToPlay4.rect)
-
-        pygame.display.flip()
-        clock.tick(60)
-        continue
-
-    # Main updates
-    pressed = pygame.key.get_pressed()
-    p1.update(pressed)
-    bgSquares.update()
-    scoreText.update()
-    heart.update(None)
-    invincible.update(None)
-    moreSpikes.update(None)
-    speedBoost.update(None)
-    powerupText.update()
-
-    # sense for collision with top or bottom of screen
-    touching = pygame.sprite.spritecollide(p1, platforms, False)
-    if touching:
-        colliding = True
-        gravityChanging = False
-    else:
-        colliding = False
-    for platform in touching:
-        p1.yvel = 0
-
-        if platform.rect.top > HEIGHT / 2:
-            p1.rect.bottom = platform.rect.top
-        else:
-            p1.rect.top = platform.rect.bottom
-
-    # sense for collision with spikes
-    spikeCollide = pygame.sprite.spritecollide(
-        p1, allSpikes, False, collided=pygame.sprite.collide_mask)
-    if spikeCollide:
-        die.play()
-        if EXTRALIFE:
-            POWERUP_TEXT = ""
-            EXTRALIFE = False
-            spikeCollide[0].kill()
+        self.ts_HowToPlay4.update("Beat your highscore!", 100, 10, False)
+
+        drawList = [(graphic.surf, graphic.rect) for graphic in self.titleScreen]
+        drawList += [(character.surf, character.rect) for character in self.characterSelectBoxes
+                     if character.color != ALLCOLORS[self.playerColor]]
+
+        if howToPlay:
+            drawList += [(text.surf, text.rect) for text in
+                         (self.ts_HowToPlay1, self.ts_HowToPlay2, self.ts_HowToPlay3, self.ts_HowToPlay4)]
+        return drawList
+
+    def updateGame(self, action):
+        # Main updates
+        if self.spaceHeld():
+            action |= SPACE_HELD
+        if self.recorder:
+            self.recorder.record(self.state.tick, action)
+        for event in self.state.step(action):
+            if event == "jump":
+                self.audio.play("jump")
+            elif event == "die":
+                self.audio.play("die")
+        if self.state.gameOver:
+            self.endRun()
+        if self.profiler:
+            self.profiler.mark("sim")
+
+        self.bgSquares.update()
+        if self.profiler:
+            self.profiler.mark("particles")
+
+    def drawGame(self, alpha):
+        self.p1.update(self.state.player, alpha)
+        self.scoreText.update(self.state.score)
+        self.powerupText.update(self.state.powerupText)
+
+        # in order to place the squares behind the player, draw them first
+        drawList = self.bgSquares.drawList(alpha)
+        drawList += [(graphic.surf, graphic.rect) for graphic in self.all_sprites]
+        for powerup in self.state.livePowerups:
+            if powerup.onScreen:
+                icon = self.powerupIcons.get(powerup.kind.name)
+                if icon is None:  # a kind the state was given that isn't one of POWERUPKINDS
+                    icon = self.powerupIcons[powerup.kind.name] = PowerupIcon(powerupImage(powerup.kind))
+                icon.update(powerup, alpha)
+                drawList.append((icon.surf, icon.rect))
+        drawList.append((self.powerupText.surf, self.powerupText.rect))
+
+        # spikes go on top of everything
+        for spike in self.state.spikes:
+            surf = spikeSprite(spike.lane, spike.squish, spikeColor)
+            y = HEIGHT - spike.squish if spike.lane == "bot" else 50
+            drawList.append((surf, surf.get_rect(topleft=(lerp(spike.lastX, spike.x, alpha), y))))
+        return drawList
+
+    def update(self, action):
+        """Move everything forward one simulation step"""
+        if self.gameOver:
+            self.updateTitleScreen()
         else:
-            gameOver = True
-            gameOverTimer = pygame.time.get_ticks()
-
-    # if invincible powerup is active, kill all spikes
-    if NOSPIKES:
-        allSpikes.empty()
-
-    for square in bgSquares:  # in order to place the squares behind the player, blit them first
-        screen.blit(square.surf, square.rect)
-
-    for graphic in all_sprites:
-        screen.blit(graphic.surf, graphic.rect)
+            self.updateGame(action)
 
-    for powerup in powerupGroup:
-        screen.blit(powerup.surf, powerup.rect)
-
-    allSpikes.update()  # update spikes here as they are blitted in update function
-
-    if not SPIKESPEED > 18:
-        SPIKESPEED += SPEEDMULTIPLIER  # speed up spikes if not too fast
+    def drawList(self, alpha):
+        """Everything on screen this frame as (surface, rect) pairs, back to front"""
+        if self.gameOver:
+            return self.drawTitleScreen(alpha)
+        else:
+            return self.drawGame(alpha)
+
+    def draw(self, alpha):
+        """Draw the current frame, alpha is how far we are between the last step and the next one"""
+        drawList = self.drawList(alpha)
+        profiler = self.profiler
+        if not profiler:
+            if self.capture:
+                self.renderer.render(currColor, drawList)
+                self.capture.grab(self.renderer.capture())
+                self.renderer.flip()
+            else:
+                self.renderer.present(currColor, drawList)
+            return
+
+        if self.profilerHud:
+            drawList += self.profilerHud.drawList((WIDTH - 5, 55))
+        profiler.mark("drawlist")
+        self.renderer.render(currColor, drawList)
+        if self.capture:
+            self.capture.grab(self.renderer.capture())
+        profiler.mark("blit")
+        self.renderer.flip()
+        profiler.mark("flip")
+        self.drawn = len(drawList)
+
+    def run(self):
+        # The simulation always steps at TICKRATE no matter how fast frames are drawn, time that hasn't been
+        # simulated yet builds up in the accumulator and is spent one step at a time
+        accumulator = 0
+        last = clockMs()
+        while self.running:
+            profiler = self.profiler
+            if profiler:
+                profiler.begin()
+            if self.fps:
+                self.inputs.wait(last + 1000 / self.fps)
+            now = clockMs()
+            accumulator += min(now - last, MAXFRAME_MS)
+            last = now
+            if profiler:
+                profiler.mark("wait")
+
+            self.handleEvents()
+            if profiler:
+                profiler.mark("events")
+            steps = 0
+            while accumulator >= TICK_MS:
+                # this step plays from now - accumulator to a tick after that. Frames are drawn between the
+                # last two steps, so what's on screen is a tick behind and input goes a tick later too, to the
+                # step that was on screen when it happened
+                self.update(self.inputs.actionFor(now - accumulator + 2 * TICK_MS))
+                accumulator -= TICK_MS
+                steps += 1
+
+            # Refresh screen
+            self.draw(accumulator / TICK_MS)
+            if self.startupStart is not None:
+                self.startupMark("first frame")
+                self.startupStart = None
+                if self.startupReport:
+                    self.printStartup()
+            if profiler:
+                profiler.end(steps, len(self.state.spikes), len(self.bgSquares), self.drawn)
+
+        if self.profiler and self.profilePath:
+            self.profiler.save(self.profilePath)
+        if self.runLog:
+            self.runLog.close()
+        if self.spawner:
+            self.spawner.feed.close()
+        if self.capture:
+            self.capture.close()
+            print(self.capture.report(), file=sys.stderr)  # stdout might be the frames
+        pygame.quit()
 
-    # Refresh screen
-    pygame.display.flip()
-    clock.tick(60)
 
-pygame.quit()
+# ----------------------------------------------------
+# Game loop
+# ----------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runnin'")
+    parser.add_argument("--fps", type=int, default=60,
+                        help="frames drawn per second, 0 for as many as possible (the game always runs at %d steps per second)" % TICKRATE)
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw the parts of the screen that changed, faster without a graphics card")
+    parser.add_argument("--textures", action="store_true",
+                        help="draw with SDL's GPU renderer, the window can then be resized or made full screen")
+    parser.add_argument("--window", metavar="WxH", help="window size with --textures, the game is scaled to fit")
+    parser.add_argument("--fullscreen", action="store_true", help="full screen with --textures")
+    parser.add_argument("--patterns", action="store_true",
+                        help="spikes come in patterns made ahead of time on another thread")
+    parser.add_argument("--record", metavar="DIR",
+                        help="save a replay of every run to DIR, play them back with replay.py")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="time every phase of the last 600 frames and save them to FILE on quit, .json or .csv")
+    parser.add_argument("--audio-buffer", type=int, default=audio.BUFFER,
+                        help="mixer buffer in samples, smaller plays sounds sooner, try 512 if the sound crackles")
+    parser.add_argument("--save-dir", metavar="DIR", default=SAVE_DIR,
+                        help="where the highscore and the log of every run are kept, default %(default)s")
+    parser.add_argument("--capture", metavar="FILE",
+                        help="write every frame drawn to FILE as raw rgb24, - for stdout to pipe into ffmpeg")
+    parser.add_argument("--capture-pngs", metavar="DIR", help="save frames drawn to DIR as PNGs")
+    parser.add_argument("--capture-every", type=int, default=1, metavar="N", help="only capture every Nth frame")
+    parser.add_argument("--capture-scale", type=int, default=1, metavar="N",
+                        help="keep every Nth pixel of captured frames each way")
+    parser.add_argument("--startup", action="store_true",
+                        help="print how long starting up took and, on quit, how long each asset took to load")
+    args = parser.parse_args()
+    windowSize = tuple(int(n) for n in args.window.lower().split("x")) if args.window else None
+    if args.capture and args.capture_pngs:
+        parser.error("--capture and --capture-pngs can't both be used")
+    capture = None
+    if args.capture or args.capture_pngs:
+        capture = FrameCapture(args.capture, args.capture_pngs, args.capture_every, args.capture_scale)
+
+    Game(fps=args.fps, dirtyRects=args.dirty_rects, recordDir=args.record, profilePath=args.profile,
+         startupReport=args.startup, audioBuffer=args.audio_buffer, saveDir=args.save_dir,
+         textures=args.textures, windowSize=windowSize, fullscreen=args.fullscreen, patterns=args.patterns,
+         capture=capture).run()
+    if args.startup:
+        print(assetCache.report(), file=sys.stderr)
@@ -0,0 +1,412 @@
+# Runnin' simulation
+# ----------------------------------------------------
+# The game logic of Runnin' with no window, no audio and no frame cap. Everything that decides whether you
+# live or die is in here, runnin.py only draws it and plays the sounds.
+#
+# A run is stepped one frame (1/60 of a second of game time) at a time:
+#
+#   state = GameState()
+#   state.reset(seed=1)
+#   while not state.gameOver:
+#       state.step(SPACE_HELD)
+#   print(state.score)
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import os
+import random
+from collections import deque
+
+from pool import Pool
+from spawns import SPIKE_RULES, SpawnScheduler
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame  # only pygame.Rect is used, nothing gets initialised
+
+WIDTH = 853
+HEIGHT = 480
+
+TICKRATE = 60  # simulation steps per second of game time
+TICK_MS = 1000 / TICKRATE
+
+SPEEDMULTIPLIER = 0.005
+STARTSPEED = 6
+MAXSPEED = 18
+
+GRAVITYSWITCH_MS = 400  # two space presses closer than this switch the gravity
+
+# Bits for the action passed to GameState.step()
+SPACE_HELD = 1  # space is down this frame, what pygame.key.get_pressed() would say
+SPACE_PRESSED = 2  # space went down this frame, what a KEYDOWN event would say
+
+# ----------------------------------------------------
+# Classes
+# ----------------------------------------------------
+
+
+class Player:
+    def __init__(self):
+        self.rect = pygame.Rect(50, HEIGHT / 2, 50, 50)
+        self.lastY = self.rect.y  # where the player was a step ago, for drawing in between steps
+
+        self.yvel = 0
+        self.gravityDown = True
+
+    def update(self, state, held):
+        if self.yvel > 15:
+            self.yvel = 15
+        if self.yvel < -15:
+            self.yvel = -15
+
+        if not state.colliding:
+            if self.gravityDown:
+                self.yvel += 1
+            else:
+                self.yvel -= 1
+
+            self.rect.move_ip(0, self.yvel)
+        if held and state.colliding:
+            if self.gravityDown:
+                self.yvel -= 15
+            else:
+                self.yvel += 15
+
+            self.rect.move_ip(0, self.yvel)
+        elif state.colliding:
+            self.yvel = 0
+
+    def gravitySwitch(self, state):
+        state.gravityChanging = True
+        self.gravityDown = not self.gravityDown
+
+
+# Spikes keep the 50x50 collision box of the old sprites, their masks were solid so the box is the hitbox
+class BottomSpike:
+    lane = "bot"
+
+    def __init__(self):
+        self.squish = 90
+        self.rect = pygame.Rect(WIDTH, HEIGHT - self.squish, 50, 50)
+        self.spawn()
+
+    def spawn(self):
+        """Put the spike back at the right edge, spikes are recycled through a Pool"""
+        self.x = WIDTH
+        self.lastX = self.x
+        self.rect.x = self.x
+
+    def update(self, state):
+        self.lastX = self.x
+        self.x -= state.spikeSpeed
+
+        self.rect.x = self.x  # update collision box position
+
+
+class TopSpike:
+    lane = "top"
+
+    def __init__(self):
+        self.squish = 90
+        self.rect = pygame.Rect(WIDTH, 50, 50, 50)
+        self.spawn()
+
+    def spawn(self):
+        """Put the spike back at the right edge, spikes are recycled through a Pool"""
+        self.x = WIDTH
+        self.lastX = self.x
+        self.rect.x = self.x
+
+    def update(self, state):
+        self.lastX = self.x
+        self.x -= state.spikeSpeed
+
+        self.rect.x = self.x  # update collision box position
+
+
+# Powerups
+# Each kind of powerup is a PowerupKind in POWERUPKINDS and a run hides one of each somewhere ahead. They wait
+# in a queue, nearest first, until they scroll onto the screen and only then get moved and collided, so a
+# powerup costs nothing until it shows up. Effects that wear off are checked until they do.
+
+
+class PowerupKind:
+    """What a powerup does: collect(state) when it's picked up, and if it wears off, expire(state) once
+    duration points have been scored while isOn(state). icon is the image in assets/ the game draws it with."""
+
+    def __init__(self, name, text, collect, duration=None, isOn=None, expire=None, icon=None):
+        self.name = name  # also the event step() returns when it's collected
+        self.text = text
+        self.icon = icon  # the game's logo if there's none
+        self.collect = collect
+        self.duration = duration
+        self.isOn = isOn
+        self.expire = expire
+
+
+def giveExtraLife(state):
+    state.extraLife = True
+
+
+def startNoSpikes(state):
+    state.noSpikes = True
+
+
+def isNoSpikes(state):
+    return state.noSpikes
+
+
+def endNoSpikes(state):
+    state.noSpikes = False
+
+
+def startMoreSpikes(state):
+    if state.player.gravityDown:
+        state.moreSpikes = "bot"
+    else:
+        state.moreSpikes = "top"
+
+
+def isMoreSpikes(state):
+    return state.moreSpikes != ""
+
+
+def endMoreSpikes(state):
+    state.moreSpikes = ""
+
+
+def speedBoost(state):
+    state.spikeSpeed += 2
+
+
+# In the order they update each step, which decides what happens when two things land on the same step
+POWERUPKINDS = [
+    PowerupKind("heart", "+1 Life", giveExtraLife, icon="heart.png"),
+    PowerupKind("invincible", "No Spikes!", startNoSpikes, 100, isNoSpikes, endNoSpikes, icon="invincible.png"),
+    PowerupKind("moreSpikes", "More Spikes!", startMoreSpikes, 250, isMoreSpikes, endMoreSpikes,
+                icon="moreSpikes.png"),
+    PowerupKind("speedBoost", "+2 Speed Increase", speedBoost, icon="speedBoost.png"),
+]
+
+
+class Powerup:
+    def __init__(self, kind, index, ahead):
+        self.kind = kind
+        self.index = index  # where its kind is in the run's list of kinds
+        self.ahead = ahead  # how far past the right edge it starts
+        self.rect = pygame.Rect(WIDTH + ahead, HEIGHT / 2, 25, 25)
+        self.lastX = self.rect.x
+        self.startScore = 0
+        self.onScreen = False
+        self.expiring = False  # collected and its effect hasn't worn off yet
+
+    @property
+    def live(self):
+        return self.onScreen or self.expiring
+
+    def enter(self, distance):
+        """Come on screen where it would be if it had been moving all along, distance is how far everything
+        had scrolled before this step"""
+        self.rect.x = WIDTH + self.ahead - distance
+        self.onScreen = True
+
+    def update(self, state, move):
+        kind = self.kind
+        if self.expiring and state.score >= self.startScore + kind.duration:
+            self.expiring = False
+            if kind.isOn(state):
+                kind.expire(state)
+                state.powerupText = ""
+
+        if not self.onScreen:
+            return
+        if self.rect.right <= 0:  # gone off the left a step ago, it's been drawn sliding out by now
+            self.onScreen = False
+            return
+        self.lastX = self.rect.x
+        self.rect.x -= move
+
+        if self.rect.colliderect(state.player.rect):
+            state.powerupText = kind.text
+            kind.collect(state)
+            self.rect.right = 0
+            self.lastX = self.rect.x
+            self.startScore = state.score
+            self.onScreen = False
+            self.expiring = kind.duration is not None
+            state.events.append(kind.name)
+            state.collected.append(kind.name)
+
+
+TOPPLATFORM = pygame.Rect(0, 0, 1000, 50)
+BOTTOMPLATFORM = pygame.Rect(0, HEIGHT - 50, 1000, 50)
+
+
+class GameState:
+    """One run of Runnin'. reset() starts a run, step() plays one frame of it. The difficulty can be changed
+    for balancing, the defaults are the game as it's played. spawner decides where spikes and powerups go,
+    anything with SpawnScheduler's reset() and due() will do."""
+
+    def __init__(self, seed=None, speedMultiplier=SPEEDMULTIPLIER, maxSpeed=MAXSPEED, spikeRules=SPIKE_RULES,
+                 powerupKinds=POWERUPKINDS, spawner=None):
+        self.random = random.Random()
+        self.speedMultiplier = speedMultiplier
+        self.maxSpeed = maxSpeed
+        self.powerupKinds = powerupKinds
+        self.spikePools = {"bot": Pool(BottomSpike), "top": Pool(TopSpike)}
+        self.lanes = {"bot": deque(), "top": deque()}
+        self.spawner = spawner or SpawnScheduler(spikeRules)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Start a new run, the same seed and the same actions always give the same run"""
+        self.random.seed(seed)
+        self.seed = seed
+
+        self.tick = 0
+        self.score = 0
+        self.spikeSpeed = STARTSPEED
+
+        self.extraLife = False
+        self.noSpikes = False
+        self.moreSpikes = ""
+        self.powerupText = ""
+
+        self.colliding = False
+        self.gravityChanging = False
+        self.gameOver = False
+        self.lastSpaceMs = -GRAVITYSWITCH_MS
+        self.events = []
+        self.collected = []  # powerups picked up this run, in order
+        self.killedBy = None  # lane of the spike that ended the run
+
+        self.player = Player()
+        # Spikes all start at the right edge and move at the same speed, so each lane stays sorted by x with
+        # the oldest spike on the left. New spikes go on the right and old ones fall off the left.
+        for laneName in self.lanes:
+            self.clearLane(laneName)
+
+        # reset powerups and their position
+        positions = self.spawner.reset(self.random, len(self.powerupKinds))
+        self.powerups = [Powerup(kind, i, pos) for i, (kind, pos) in enumerate(zip(self.powerupKinds, positions))]
+        self.powerupQueue = deque(sorted(self.powerups, key=lambda powerup: (powerup.ahead, powerup.index)))
+        self.livePowerups = []  # on screen or wearing off, in powerupKinds order
+        self.distance = 0  # how far powerups have scrolled left
+        self.updatePowerups()
+
+    @property
+    def timeMs(self):
+        return self.tick * TICK_MS
+
+    @property
+    def spikes(self):
+        return list(self.lanes["bot"]) + list(self.lanes["top"])
+
+    def updatePowerups(self):
+        move = int(self.spikeSpeed)  # whole pixels, like Rect.move_ip
+        queue = self.powerupQueue
+        if queue and queue[0].ahead < self.distance + move:  # its left edge comes past the right of the screen
+            while queue and queue[0].ahead < self.distance + move:
+                queue.popleft().enter(self.distance)
+            self.livePowerups = [powerup for powerup in self.powerups if powerup.live]
+        self.distance += move
+
+        for powerup in self.livePowerups:
+            powerup.update(self, move)
+        if not all(powerup.live for powerup in self.livePowerups):
+            self.livePowerups = [powerup for powerup in self.livePowerups if powerup.live]
+
+    def spawnSpikes(self, now):
+        for laneName in self.spawner.due(now, self.random, self.spikeSpeed, self.moreSpikes):
+            # a spike that would overlap the last one in its lane never gets made
+            lane = self.lanes[laneName]
+            if lane and WIDTH - lane[-1].x < 50:
+                continue
+            spike = self.spikePools[laneName].acquire()
+            spike.spawn()
+            lane.append(spike)
+
+    def clearLane(self, laneName):
+        pool = self.spikePools[laneName]
+        for spike in self.lanes[laneName]:
+            pool.release(spike)
+        self.lanes[laneName].clear()
+
+    def spikeHit(self):
+        """The lane and index of the oldest spike touching the player, or None"""
+        for laneName, lane in self.lanes.items():
+            for i, spike in enumerate(lane):
+                if spike.rect.left >= self.player.rect.right:
+                    break  # everything after this is further right
+                if self.player.rect.colliderect(spike.rect):
+                    return laneName, i
+        return None
+
+    def step(self, action=0):
+        """Play one frame and return the events that happened in it ("jump", "die", powerup names)"""
+        self.events = []
+        if self.gameOver:
+            return self.events
+
+        self.tick += 1
+        now = self.timeMs
+        self.player.lastY = self.player.rect.y
+
+        if action & SPACE_PRESSED and not self.gravityChanging:
+            self.events.append("jump")
+            if now - self.lastSpaceMs < GRAVITYSWITCH_MS:
+                self.player.gravitySwitch(self)
+            self.lastSpaceMs = now
+
+        self.spawnSpikes(now)
+
+        self.player.update(self, action & SPACE_HELD)
+        self.score += 1
+        self.updatePowerups()
+
+        # sense for collision with top or bottom of screen
+        touching = [platform for platform in (TOPPLATFORM, BOTTOMPLATFORM)
+                    if self.player.rect.colliderect(platform)]
+        if touching:
+            self.colliding = True
+            self.gravityChanging = False
+        else:
+            self.colliding = False
+        for platform in touching:
+            self.player.yvel = 0
+
+            if platform.top > HEIGHT / 2:
+                self.player.rect.bottom = platform.top
+            else:
+                self.player.rect.top = platform.bottom
+
+        # sense for collision with spikes, only the few at the left of each lane can reach the player
+        hit = self.spikeHit()
+        if hit:
+            self.events.append("die")
+            if self.extraLife:
+                self.powerupText = ""
+                self.extraLife = False
+                laneName, i = hit
+                spike = self.lanes[laneName][i]
+                del self.lanes[laneName][i]
+                self.spikePools[laneName].release(spike)
+            else:
+                self.gameOver = True
+                self.killedBy = hit[0]
+
+        for laneName, lane in self.lanes.items():
+            # if invincible powerup is active, kill all spikes
+            if self.noSpikes:
+                self.clearLane(laneName)
+
+            for spike in lane:
+                spike.update(self)
+
+            while lane and lane[0].rect.right <= 0:
+                self.spikePools[laneName].release(lane.popleft())
+
+        if not self.spikeSpeed > self.maxSpeed:
+            self.spikeSpeed += self.speedMultiplier  # speed up spikes if not too fast
+
+        return self.events
@@ -0,0 +1,93 @@
+# Runnin' spawn schedule
+# ----------------------------------------------------
+# When spikes appear is data now instead of code: a SpawnRule per lane says how long the first spike takes,
+# how far apart spikes are at each speed tier and how fast they come during a More Spikes! flood. The
+# SpawnScheduler keeps the next spawn of every rule in a heap keyed on simulation time, so a flood is one
+# entry being popped and pushed every step instead of a timer hammering the event queue, and it can be
+# stepped and looked at with no window at all:
+#
+#   scheduler = SpawnScheduler(SPIKE_RULES)
+#   scheduler.reset(random.Random(1))
+#   print(scheduler.pending())
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import heapq
+
+# (spike speed above, shortest ms, longest ms), the first tier the speed is above is used
+SPIKE_TIERS = (
+    (16, 100, 400),  # if speed is high, make more spikes
+    (12, 300, 650),
+    (float("-inf"), 500, 1000),
+)
+FLOOD_MS = 10  # a flooded lane gets a spike every step, as close as they fit
+POWERUP_AHEAD = (200, 30000)  # how far into a run a powerup can be, in pixels scrolled
+
+
+class SpawnRule:
+    """When one lane spawns, order breaks ties between rules due at the same time (lower goes first)"""
+
+    def __init__(self, lane, order, firstMs=(600, 1000), tiers=SPIKE_TIERS, floodMs=FLOOD_MS):
+        # a lane that could be due again the moment it spawns would keep due() looping forever
+        if not floodMs > 0:
+            raise ValueError(f"{lane} lane floodMs has to be above 0, not {floodMs}")
+        for above, low, high in tiers:
+            if not 0 < low <= high:
+                raise ValueError(f"{lane} lane tier above speed {above} needs 0 < shortest <= longest ms, "
+                                 f"not {low}, {high}")
+        self.lane = lane
+        self.order = order
+        self.firstMs = firstMs
+        self.tiers = tiers
+        self.floodMs = floodMs
+
+    def first(self, rand):
+        return rand.randint(*self.firstMs)
+
+    def interval(self, rand, speed, flooded):
+        """Milliseconds until this lane spawns again"""
+        if flooded:
+            return self.floodMs
+        for above, low, high in self.tiers:
+            if speed > above:
+                return rand.randint(low, high)
+        raise ValueError(f"no spawn tier for speed {speed}")
+
+
+# Listed in the order their first spawns are drawn, the top lane always drew first. When both are due at
+# once the bottom lane goes first.
+SPIKE_RULES = (
+    SpawnRule("top", 1),
+    SpawnRule("bot", 0),
+)
+
+
+class SpawnScheduler:
+    """The next spawn time of every rule, due() hands back the lanes whose time has come"""
+
+    def __init__(self, rules=SPIKE_RULES):
+        self.rules = rules
+        self.heap = []  # (due ms, order, index, rule), the index settles rules with the same order
+
+    def reset(self, rand, powerups=0):
+        """Start a run, returns how far ahead of the start each of the run's powerups is placed"""
+        positions = [rand.randint(*POWERUP_AHEAD) for _ in range(powerups)]
+        self.heap = [(rule.first(rand), rule.order, i, rule) for i, rule in enumerate(self.rules)]
+        heapq.heapify(self.heap)
+        return positions
+
+    def due(self, now, rand, speed, floodLane):
+        """Lanes that spawn at sim time now, earliest first, each one's next spawn is scheduled as it's
+        handed out. Schedules restart from now, not from when they were due, like pygame.time.set_timer did."""
+        lanes = []
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            _, order, i, rule = heapq.heappop(heap)
+            heapq.heappush(heap, (now + rule.interval(rand, speed, rule.lane == floodLane), order, i, rule))
+            lanes.append(rule.lane)
+        return lanes
+
+    def pending(self):
+        """(due ms, lane) of every rule, soonest first"""
+        return [(dueMs, rule.lane) for dueMs, _, _, rule in sorted(self.heap, key=lambda entry: entry[:3])]
@@ -0,0 +1,185 @@
+# Runnin' difficulty sweep
+# ----------------------------------------------------
+# Plays a grid of difficulty settings headless with a scripted player, spread over every core, and writes the
+# score distribution of each setting to a JSON lines file as soon as all its runs are in. Every setting is
+# played on the same seeds, so the differences between them come from the settings and not from luck.
+#
+# The player plans its way past the spikes on screen with oracle.py, the way someone who can see them coming
+# would, but knows nothing about spikes that haven't spawned yet. It gets to the top speed in most runs, and
+# how fast runs got is written out with the scores, so a setting that no run got far enough to feel shows up.
+#
+#   python sweep.py --grid speedMultiplier=0.004,0.005,0.006 --grid maxSpeed=16,18,20 --runs 500
+#
+# Settings that can be swept, anything left out stays as the game has it:
+#
+#   speedMultiplier   how much faster spikes get every step
+#   maxSpeed          the speed spikes stop speeding up at
+#   spawnScale        multiplies every gap between spikes, below 1 is more spikes
+#   invincible        points No Spikes! lasts
+#   moreSpikes        points More Spikes! lasts
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+import argparse
+import copy
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import oracle
+from simulation import WIDTH, SPEEDMULTIPLIER, MAXSPEED, SPACE_HELD, POWERUPKINDS, GameState
+from spawns import SPIKE_RULES, SpawnRule
+
+DEFAULTS = {
+    "speedMultiplier": SPEEDMULTIPLIER,
+    "maxSpeed": MAXSPEED,
+    "spawnScale": 1.0,
+    **{kind.name: kind.duration for kind in POWERUPKINDS if kind.duration},  # how long each powerup lasts
+}
+
+JUMP_FROM = 120  # x of the nearest spike ahead that the scripted player starts jumping at
+JUMP_STEPS = 5  # and how many steps of spike movement past that it keeps jumping for
+
+
+def gameState(params):
+    """A GameState with params in place of the game's own difficulty"""
+    scale = params["spawnScale"]
+    rules = tuple(SpawnRule(rule.lane, rule.order, rule.firstMs,
+                            tuple((above, round(low * scale), round(high * scale)) for above, low, high in rule.tiers),
+                            rule.floodMs)
+                  for rule in SPIKE_RULES)
+    kinds = []
+    for kind in POWERUPKINDS:
+        if kind.name in params:
+            kind = copy.copy(kind)
+            kind.duration = params[kind.name]
+        kinds.append(kind)
+    return GameState(speedMultiplier=params["speedMultiplier"], maxSpeed=params["maxSpeed"], spikeRules=rules,
+                     powerupKinds=kinds)
+
+
+def policy(state):
+    """Hold space while the next spike on the floor is just ahead, never switch gravity"""
+    lane = state.lanes["bot" if state.player.gravityDown else "top"]
+    for spike in lane:
+        if spike.rect.x >= JUMP_FROM:
+            return SPACE_HELD if spike.rect.x < JUMP_FROM + JUMP_STEPS * state.spikeSpeed else 0
+    return 0
+
+
+class Planner:
+    """Plays the actions the oracle finds past every spike on screen, planning again whenever a spike spawns
+    or something other than a jump happens. Falls back on policy() when there's no way past."""
+
+    def __init__(self):
+        self.oracle = oracle.Oracle(cacheSize=0)  # nothing repeats, every plan starts somewhere new
+        self.plan = None  # actions still to play, the next one last
+
+    def __call__(self, state):
+        # a spike's lastX is only the right edge on the step it spawned, spikes leaving don't change anything
+        spawned = any(lane and lane[-1].lastX == WIDTH for lane in state.lanes.values())
+        if self.plan is None or spawned or any(event != "jump" for event in state.events):
+            # far enough ahead for a spike at the right edge to get past the player
+            steps = math.ceil(WIDTH / state.spikeSpeed) + 2
+            path = self.oracle.path(oracle.dangerFromState(state, steps), oracle.playerState(state), state.tick)
+            self.plan = path[::-1] if path is not None else []
+            if path is None:
+                return policy(state)
+        return self.plan.pop() if self.plan else 0
+
+
+def playRuns(params, seeds, maxSteps):
+    """(score, spike speed it got to) of one run per seed, runs that last maxSteps are stopped there"""
+    state = gameState(params)
+    results = []
+    for seed in seeds:
+        state.reset(seed)
+        player = Planner()
+        while not state.gameOver and state.tick < maxSteps:
+            state.step(player(state))
+        results.append((state.score, state.spikeSpeed))
+    return results
+
+
+def summarize(results, maxSteps, maxSpeed):
+    speeds = [speed for _, speed in results]
+    scores = sorted(score for score, _ in results)
+    deciles = statistics.quantiles(scores, n=10) if len(scores) > 1 else scores * 9
+    return {
+        "runs": len(scores),
+        "mean": statistics.fmean(scores),
+        "stdev": statistics.stdev(scores) if len(scores) > 1 else 0.0,
+        "min": scores[0],
+        "p10": deciles[0],
+        "p50": deciles[4],
+        "p90": deciles[8],
+        "max": scores[-1],
+        "survived": sum(score >= maxSteps for score in scores),  # still alive when they were stopped
+        "meanSpeed": statistics.fmean(speeds),  # how fast spikes were when runs ended
+        "topSpeed": max(speeds),
+        "cappedRuns": sum(speed >= maxSpeed for speed in speeds),  # runs that got to maxSpeed
+    }
+
+
+def parseGrid(specs):
+    """["name=1,2", ...] to a list of settings, every combination of the values, all numbers are floats"""
+    axes = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in DEFAULTS:
+            raise ValueError(f"can't sweep {name}, try one of {', '.join(DEFAULTS)}")
+        axes[name] = [float(value) for value in values.split(",")]
+    return [dict(DEFAULTS, **dict(zip(axes, values))) for values in itertools.product(*axes.values())]
+
+
+# ----------------------------------------------------
+# Command line
+# ----------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep Runnin' difficulty settings over every core")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2",
+                        help="values to try for one setting, repeat for more settings: " + ", ".join(DEFAULTS))
+    parser.add_argument("--runs", type=int, default=200, help="runs per setting")
+    parser.add_argument("--seed", type=int, default=0, help="first seed, settings all use the same seeds")
+    parser.add_argument("--max-steps", type=int, default=60 * 60 * 10, help="stop runs that get this far")
+    parser.add_argument("--chunk", type=int, default=50, help="runs per job handed to a worker")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes, default every core")
+    parser.add_argument("--out", default="sweep.jsonl", help="JSON lines file the results are appended to")
+    args = parser.parse_args()
+
+    try:
+        grid = parseGrid(args.grid)
+    except ValueError as e:
+        parser.error(str(e))
+    seeds = range(args.seed, args.seed + args.runs)
+    chunks = [seeds[i:i + args.chunk] for i in range(0, len(seeds), args.chunk)]
+    print(f"{len(grid)} settings x {args.runs} runs on {args.workers} workers", file=sys.stderr)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool, open(args.out, "a") as out:
+        jobs = {pool.submit(playRuns, params, chunk, args.max_steps): i
+                for i, params in enumerate(grid) for chunk in chunks}
+        results = [[] for _ in grid]
+        waiting = [len(chunks)] * len(grid)
+        for job in as_completed(jobs):
+            i = jobs[job]
+            results[i] += job.result()
+            waiting[i] -= 1
+            if waiting[i]:
+                continue
+            # every run of this setting is in, write it out now rather than at the end
+            result = {"params": grid[i], "seeds": [seeds.start, seeds.stop], "maxSteps": args.max_steps,
+                      **summarize(results[i], args.max_steps, grid[i]["maxSpeed"])}
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            changed = {name: value for name, value in grid[i].items() if value != DEFAULTS[name]}
+            print(f"{json.dumps(changed)} mean {result['mean']:.0f} p50 {result['p50']:.0f} p90 {result['p90']:.0f} "
+                  f"top speed {result['topSpeed']:.2f}, {result['cappedRuns']} runs capped", file=sys.stderr)
+            results[i] = None
+    print(f"done in {time.perf_counter() - start:.1f} s, results in {args.out}", file=sys.stderr)
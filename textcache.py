@@ -0,0 +1,70 @@
+# Runnin' text cache
+# ----------------------------------------------------
+# Rendering text with pygame.font is slow, and most of the text in the game never changes. Everything goes
+# through one cache here so a string is only rasterised the first time it's drawn, and the score is put
+# together from ten pre-rendered digits instead of being rendered every frame.
+
+# ----------------------------------------------------
+# Imports
+# ----------------------------------------------------
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """Rendered text surfaces keyed by (font, size, text, color), the least recently used go first when full"""
+
+    def __init__(self, maxSize=256):
+        self.maxSize = maxSize
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, fontDir, size):
+        key = (fontDir, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(fontDir, size)
+        return self.fonts[key]
+
+    def render(self, fontDir, size, text, color):
+        key = (fontDir, size, text, color)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        surf = self.font(fontDir, size).render(text, True, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.maxSize:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+textCache = TextCache()
+
+
+class DigitAtlas:
+    """The digits 0-9 rendered once, numbers are drawn by blitting them side by side"""
+
+    def __init__(self, fontDir, size, color, cache=textCache):
+        self.digits = [cache.render(fontDir, size, str(d), color) for d in range(10)]
+        self.height = max(digit.get_height() for digit in self.digits)
+
+    def width(self, number):
+        return sum(self.digits[int(d)].get_width() for d in str(number))
+
+    def draw(self, surf, number, pos):
+        """Blit number onto surf with its top left corner at pos, returns the width drawn"""
+        x, y = pos
+        for d in str(number):
+            digit = self.digits[int(d)]
+            surf.blit(digit, (x, y))
+            x += digit.get_width()
+        return x - pos[0]